@@ -0,0 +1,5 @@
+"""
+Benchmarks for jsonc
+
+Run the suite with `python -m benchmarks` from the repository root, see `python -m benchmarks --help`
+"""
@@ -0,0 +1,48 @@
+"""
+Check that parsing scales linearly with the amount of block comment text
+
+Run with `python -m benchmarks.block_comments` from the repository root
+"""
+
+import sys
+import timeit
+
+import jsonc
+
+SIZES = [500, 1000, 2000, 4000, 8000, 16000]
+# the largest input may cost at most this many times more per byte than the smallest one
+MAX_SLOWDOWN = 3.0
+
+def make_document(count):
+    """
+    Build a JSONC document with `count` multi-line block comments
+    """
+    lines = ['{']
+    for i in range(count):
+        lines.append('    /*')
+        lines.append(f'     * Copyright notice {i}')
+        lines.append('     * Permission is hereby granted, free of charge, to any person obtaining a copy')
+        lines.append('     */')
+        lines.append(f'    "key{i}": "value {i}",')
+    lines.append('    "end": true')
+    lines.append('}')
+    return '\n'.join(lines)
+
+def main():
+    results = []
+    print(f'{"comments":>10} {"bytes":>12} {"seconds":>10} {"ns/byte":>10}')
+    for size in SIZES:
+        text = make_document(size)
+        seconds = min(timeit.repeat(lambda: jsonc.loads(text), number=1, repeat=5))
+        per_byte = seconds / len(text) * 1e9
+        results.append(per_byte)
+        print(f'{size:>10} {len(text):>12} {seconds:>10.4f} {per_byte:>10.3f}')
+
+    slowdown = results[-1] / results[0]
+    print(f'Per-byte cost ratio (largest / smallest): {slowdown:.2f}')
+    if slowdown > MAX_SLOWDOWN:
+        print('Parsing block comments does not scale linearly')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
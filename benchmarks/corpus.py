@@ -0,0 +1,94 @@
+"""
+Generate synthetic JSONC documents
+"""
+
+import random
+
+COMMENT_STYLES = ('c', 'python', 'block', 'inline')
+
+# named document shapes used by the suite, sizes are multiplied by the scale
+SHAPES = {
+    'wide': dict(entries=2000, depth=1, list_length=5, comment_density=0.2),
+    'deep': dict(entries=50, depth=40, branching=1, list_length=3, comment_density=0.2),
+    'long_lists': dict(entries=20, depth=1, list_length=2000, comment_density=0.05),
+    'comment_heavy': dict(entries=1000, depth=2, list_length=5, comment_density=1.0),
+    'no_comments': dict(entries=2000, depth=2, list_length=5, comment_density=0.0),
+}
+
+def _comment(rng, styles, padding):
+    """
+    Build a comment on its own line
+    """
+    style = rng.choice(styles)
+    if style == 'c':
+        return f'{padding}// comment {rng.random():.6f}'
+    if style == 'python':
+        return f'{padding}# comment {rng.random():.6f}'
+    return f'{padding}/*\n{padding} * block comment {rng.random():.6f}\n{padding} */'
+
+def _scalar(rng, index):
+    """
+    Build a scalar value
+    """
+    kind = index % 5
+    if kind == 0:
+        return f'"value {index} // not a comment"'
+    if kind == 1:
+        return str(index)
+    if kind == 2:
+        return f'{rng.random() * 1000:.4f}'
+    if kind == 3:
+        return 'true' if index % 2 else 'false'
+    return 'null'
+
+def generate(entries=100, depth=2, branching=2, list_length=5, comment_density=0.2, comment_styles=COMMENT_STYLES, seed=0):
+    """
+    Build a JSONC document
+
+    The root has `entries` keys, each holding dictionaries nested `depth` levels deep with
+    `branching` keys per level. The innermost dictionaries hold a few scalars and a list of
+    `list_length` items. Each entry is preceded by a comment with probability `comment_density`,
+    drawn from `comment_styles` (c, python, block, inline)
+    """
+    rng = random.Random(seed)
+    block_styles = [s for s in comment_styles if s != 'inline']
+    inline = 'inline' in comment_styles
+    lines = []
+
+    def add_entries(count, level, prefix, items):
+        padding = '    ' * level
+        for i in range(count):
+            if comment_density and rng.random() < comment_density and block_styles:
+                lines.append(_comment(rng, block_styles, padding))
+            comma = ',' if i < count - 1 or items else ''
+            suffix = ''
+            if inline and comment_density and rng.random() < comment_density:
+                suffix = ' // inline comment'
+            key = f'"{prefix}{i}"'
+            if level > depth:
+                lines.append(f'{padding}{key}: {_scalar(rng, i)}{comma}{suffix}')
+            else:
+                lines.append(f'{padding}{key}: {{')
+                if level == depth:
+                    add_entries(3, level + 1, 'leaf', True)
+                else:
+                    add_entries(branching, level + 1, 'level', False)
+                lines.append(f'{padding}}}{comma}{suffix}')
+        if items:
+            values = ', '.join(_scalar(rng, j) for j in range(list_length))
+            lines.append(f'{padding}"items": [{values}]')
+
+    lines.append('{')
+    add_entries(entries, 1, 'entry', False)
+    lines.append('}')
+    return '\n'.join(lines)
+
+def shape(name, scale=1.0):
+    """
+    Build the document for a named shape with its sizes multiplied by scale
+    """
+    params = dict(SHAPES[name])
+    params['entries'] = max(1, int(params['entries'] * scale))
+    if name == 'long_lists':
+        params['list_length'] = max(1, int(params['list_length'] * scale))
+    return generate(**params)
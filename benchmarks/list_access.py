@@ -0,0 +1,77 @@
+"""
+Check that indexed access, iteration and slicing of a commented JSONCList do not depend on its length
+
+Run with `python -m benchmarks.list_access` from the repository root
+"""
+
+import random
+import sys
+import timeit
+
+import jsonc
+
+SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+# every nth item of the generated lists has a comment
+COMMENT_EVERY = 10
+# per-operation cost of the largest list may be at most this many times that of the smallest one
+MAX_SLOWDOWN = 4.0
+
+def make_document(size):
+    """
+    Build a JSONC list with `size` items and a comment every COMMENT_EVERY items
+    """
+    lines = ['[']
+    for i in range(size):
+        if i % COMMENT_EVERY == 0:
+            lines.append(f'    // item {i}')
+        lines.append(f'    {{"id": {i}}},' if i % 2 else f'    "item {i}",')
+    lines.append(']')
+    return '\n'.join(lines)
+
+def per_op(func, ops):
+    """
+    Best time of a few runs of func, in nanoseconds per operation
+    """
+    return min(timeit.repeat(func, number=1, repeat=3)) / ops * 1e9
+
+def main():
+    rows = []
+    print(f'{"items":>10} {"get ns":>10} {"iter ns":>10} {"slice ns":>10} {"insert ns":>10}')
+    for size in SIZES:
+        data = jsonc.loads(make_document(size))
+        indices = [random.randrange(size) for _ in range(10000)]
+        middle = size // 2
+
+        def get():
+            for i in indices:
+                data[i]
+
+        def iterate():
+            for _ in data:
+                pass
+
+        def slice_():
+            for _ in range(1000):
+                data[middle:middle + 5]
+
+        def insert():
+            for _ in range(100):
+                data.insert(middle, 'new')
+                del data[middle]
+
+        row = (per_op(get, len(indices)), per_op(iterate, size), per_op(slice_, 1000), per_op(insert, 200))
+        rows.append(row)
+        print(f'{size:>10} {row[0]:>10.1f} {row[1]:>10.1f} {row[2]:>10.1f} {row[3]:>10.1f}')
+
+    failed = False
+    for column, name in enumerate(['indexed access', 'iteration', 'slicing']):
+        slowdown = rows[-1][column] / rows[0][column]
+        print(f'{name} cost ratio (largest / smallest): {slowdown:.2f}')
+        if slowdown > MAX_SLOWDOWN:
+            print(f'{name} does not run in constant time')
+            failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
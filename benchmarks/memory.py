@@ -0,0 +1,72 @@
+"""
+Compare the memory used per node by jsonc with that of plain dicts and lists from the json module
+
+Run with `python -m benchmarks.memory` from the repository root
+"""
+
+import json
+import sys
+import tracemalloc
+
+import jsonc
+
+# number of small objects in the generated documents
+COUNT = 20000
+# a jsonc node without comments may use at most this many times the memory of a plain dict or list
+MAX_RATIO = 3.0
+
+DOCUMENTS = {
+    # an object with a nested list per item
+    'objects': lambda i: f'{{"id": {i}, "tags": ["t{i}"]}}',
+    # an object with a comment per item
+    'commented': lambda i: f'{{\n    // item {i}\n    "id": {i}\n}}',
+    # a short list per item
+    'lists': lambda i: f'[{i}, {i + 1}]',
+}
+
+def measure(loads, text):
+    """
+    Bytes held by the result of loads(text)
+    """
+    tracemalloc.start()
+    data = loads(text)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    return size
+
+def count_nodes(data):
+    """
+    Number of dicts and lists in data
+    """
+    count = 0
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        count += 1
+        for value in (node.values() if isinstance(node, dict) else node):
+            if isinstance(value, (dict, list)):
+                stack.append(value)
+    return count
+
+def main():
+    print(f'{"document":>10} {"nodes":>8} {"json B/node":>12} {"jsonc B/node":>13} {"bytes B/node":>13} {"ratio":>6}')
+    failed = False
+    for name, item in DOCUMENTS.items():
+        text = '[\n' + ',\n'.join(item(i) for i in range(COUNT)) + '\n]'
+        nodes = count_nodes(json.loads(jsonc.dumps(jsonc.loads(text), comments=False)))
+        plain = measure(json.loads, jsonc.dumps(jsonc.loads(text), comments=False)) / nodes
+        parsed = measure(jsonc.loads, text) / nodes
+        # trees loaded from bytes do not keep the source spans
+        from_bytes = measure(jsonc.loads, text.encode('utf-8')) / nodes
+        ratio = parsed / plain
+        print(f'{name:>10} {nodes:>8} {plain:>12.1f} {parsed:>13.1f} {from_bytes:>13.1f} {ratio:>6.2f}')
+        # comments are stored on top of the data, so only documents without them are checked
+        if name != 'commented' and ratio > MAX_RATIO:
+            print(f'{name} uses more than {MAX_RATIO} times the memory of plain dicts and lists')
+            failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""
+Time the hot paths of jsonc on synthetic documents and compare the results against a baseline
+"""
+
+import argparse
+import io
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+
+import jsonc
+from benchmarks import corpus
+
+def _walk(node, visit):
+    """
+    Call visit on every JSONCDict and JSONCList below node
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        visit(node)
+        for value in (node.values() if isinstance(node, dict) else node):
+            if isinstance(value, (jsonc.JSONCDict, jsonc.JSONCList)):
+                stack.append(value)
+
+def _paths(doc):
+    """
+    Find the key paths of every scalar in the dictionaries of doc
+    """
+    paths = []
+    stack = [(doc, ())]
+    while stack:
+        node, path = stack.pop()
+        for key in node:
+            value = node[key]
+            if isinstance(value, jsonc.JSONCDict):
+                stack.append((value, path + (key,)))
+            elif not isinstance(value, jsonc.JSONCList):
+                paths.append(path + (key,))
+    return paths
+
+def case_loads(text, doc):
+    return lambda: jsonc.loads(text), 1
+
+def case_loads_plain(text, doc):
+    return lambda: jsonc.loads(text, preserve_comments=False), 1
+
+def case_load(text, doc):
+    return lambda: jsonc.load(io.StringIO(text)), 1
+
+def case_dumps(text, doc):
+    return lambda: jsonc.dumps(doc), 1
+
+def case_getitem(text, doc):
+    paths = _paths(doc)
+
+    def run():
+        for path in paths:
+            node = doc
+            for key in path:
+                node = node[key]
+    return run, len(paths)
+
+def case_setitem(text, doc):
+    paths = _paths(doc)
+
+    def run():
+        for path in paths:
+            node = doc
+            for key in path[:-1]:
+                node = node[key]
+            node[path[-1]] = 0
+    return run, len(paths)
+
+def case_list_iteration(text, doc):
+    lists = []
+    _walk(doc, lambda node: lists.append(node) if isinstance(node, jsonc.JSONCList) else None)
+    count = sum(len(lst) for lst in lists)
+
+    def run():
+        for lst in lists:
+            for _ in lst:
+                pass
+    return run, max(count, 1)
+
+def case_with_comments(text, doc):
+    return lambda: doc.jsonc_with_comments, 1
+
+def case_clean_comments(text, doc):
+    tree = doc.jsonc_with_comments
+    return lambda: jsonc.clean_comments(tree), 1
+
+def case_fix_types(text, doc):
+    return lambda: jsonc.JSONCDict.fix_types(doc), 1
+
+def case_merge(text, doc):
+    # two copies of the document overlap everywhere, so nothing can be shared
+    layers = (doc.freeze(), jsonc.loads(text).freeze())
+    return lambda: jsonc.merge(*layers), 1
+
+# each case gets the document text and a parsed copy, and returns a callable and the number of
+# operations one call of it performs
+CASES = {
+    'loads': case_loads,
+    'loads_plain': case_loads_plain,
+    'load': case_load,
+    'dumps': case_dumps,
+    'getitem': case_getitem,
+    'setitem': case_setitem,
+    'list_iteration': case_list_iteration,
+    'with_comments': case_with_comments,
+    'clean_comments': case_clean_comments,
+    'fix_types': case_fix_types,
+    'merge': case_merge,
+}
+
+def run(shapes=None, cases=None, scale=0.25, repeat=3, memory=True):
+    """
+    Run the suite, returning a dict of results keyed by "<shape>/<case>"
+    """
+    results = {}
+    for shape in shapes or corpus.SHAPES:
+        text = corpus.shape(shape, scale)
+        for name in cases or CASES:
+            # parse a fresh copy for each case so that mutating cases do not affect the others
+            func, ops = CASES[name](text, jsonc.loads(text))
+            seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+            result = {
+                'bytes': len(text),
+                'ops': ops,
+                'seconds': seconds,
+                'ns_per_op': seconds / ops * 1e9,
+            }
+            if memory:
+                tracemalloc.start()
+                func()
+                result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            results[f'{shape}/{name}'] = result
+            print(f'{shape + "/" + name:<30} {seconds:>10.4f}s {result["ns_per_op"]:>14.1f} ns/op'
+                  + (f' {result["peak_bytes"] / 1e6:>10.2f} MB peak' if memory else ''))
+    return results
+
+def compare(results, baseline, threshold=1.25, memory_threshold=1.25):
+    """
+    List the results that are slower or use more memory than the baseline allows
+    """
+    regressions = []
+    for key, base in baseline['results'].items():
+        current = results.get(key)
+        if current is None:
+            continue
+        ratio = current['ns_per_op'] / base['ns_per_op']
+        if ratio > threshold:
+            regressions.append(f'{key}: {ratio:.2f}x slower than the baseline')
+        if 'peak_bytes' in current and base.get('peak_bytes'):
+            ratio = current['peak_bytes'] / base['peak_bytes']
+            if ratio > memory_threshold:
+                regressions.append(f'{key}: {ratio:.2f}x more peak memory than the baseline')
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.strip())
+    parser.add_argument('--shape', action='append', choices=sorted(corpus.SHAPES), help='document shape to run, can be repeated (default: all)')
+    parser.add_argument('--case', action='append', choices=sorted(CASES), help='case to run, can be repeated (default: all)')
+    parser.add_argument('--scale', type=float, default=0.25, help='multiplier for the size of the documents')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed runs, the best one is kept')
+    parser.add_argument('--backend', default='json', choices=jsonc.BACKENDS, help='JSON backend to parse documents without comments with')
+    parser.add_argument('--no-memory', action='store_true', help='skip measuring peak memory with tracemalloc')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='compare the results against this JSON file and fail on regressions')
+    parser.add_argument('--threshold', type=float, default=1.25, help='allowed slowdown against the baseline')
+    parser.add_argument('--memory-threshold', type=float, default=1.25, help='allowed peak memory growth against the baseline')
+    args = parser.parse_args(argv)
+    jsonc.set_backend(args.backend)
+
+    results = run(args.shape, args.case, args.scale, args.repeat, not args.no_memory)
+    report = {
+        'jsonc_version': jsonc.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': args.scale,
+        'backend': args.backend,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('scale') != args.scale:
+            print(f'The baseline was recorded with scale {baseline.get("scale")}, not {args.scale}')
+            sys.exit(2)
+        regressions = compare(results, baseline, args.threshold, args.memory_threshold)
+        for regression in regressions:
+            print(regression)
+        if regressions:
+            sys.exit(1)
+        print('No regressions against the baseline')
@@ -1,20 +1,46 @@
+import io
 import json
+import os
 import re
+import array
 import uuid
-import copy
+import time
+import types
+import asyncio
+import codecs
+import mmap as mmap_module
+import threading
+import contextlib
+import functools
+import itertools
 import collections
+import collections.abc
+import concurrent.futures
+import tracemalloc
+import warnings
+from json.decoder import scanstring
+from json.encoder import encode_basestring_ascii
+from json.scanner import NUMBER_RE
 
 __version__ = '1.1.0'
 
-def _finditem(obj, key):
-    if key in obj: return obj[key]
-    for k, v in obj.items():
-        if isinstance(v,dict):
-            item = _finditem(v, key)
-            if item is not None:
-                return item
+# per-thread state, holds the nodes changed inside of a batch
+_local = threading.local()
+
+# callback that is given (phase, info) records while profiling, see set_profiler
+_profiler = None
+
+# set once any node has built a key index for find, until then changes skip looking for indexes
+_indexed = False
+
+# stands for a missing key or value
+_MISSING = object()
 
 class JSONCDict(dict):
+    # slots keep the nodes small, there can be millions of them in a large document
+    __slots__ = ('_comments', '_root_comments', 'jsonc_parent', 'jsonc_key', 'jsonc_dtypes', 'jsonc_dirty',
+                 'jsonc_source', 'jsonc_span', 'jsonc_edits', '_index', '_subscribers', '_hash')
+
     def __init__(self, parent=None, jsonc_key=None, jsonc_dtypes=None, *args, **kwargs):
         """
         Initialize the dictionary
@@ -22,92 +48,150 @@ class JSONCDict(dict):
 
         super(JSONCDict, self).__init__(*args, **kwargs)
         # create the variables that we'll use to deal with the comments
-        self.jsonc_with_comments = {}
+        # comments are kept in a side table that maps the key of the entry they belong to
+        # (or None for the end of the dictionary) to a list of (style, text) tuples. Most
+        # dictionaries have no comments so the table is only created when it is first used
+        self._comments = None
+        # the comments before and after the dictionary when it is the root of a document
+        self._root_comments = None
         self.jsonc_parent = parent
         self.jsonc_key = jsonc_key
         self.jsonc_dtypes = jsonc_dtypes
+        # set once the dictionary or anything below it has been changed
+        self.jsonc_dirty = False
+        # the text the dictionary was parsed from and an array of the start and end of the
+        # dictionary in it followed by the start and end of each value. The span is dropped when
+        # entries are added or removed and the keys whose values were replaced since are kept
+        # in jsonc_edits
+        self.jsonc_source = None
+        self.jsonc_span = None
+        self.jsonc_edits = None
+        # maps each key found below the dictionary to the dictionaries holding it, built by find
+        self._index = None
+        # (path, callback) pairs told about the patches applied to the dictionary
+        self._subscribers = None
+        # set by freeze, only frozen dictionaries are hashable
+        self._hash = None
+
+    @property
+    def jsonc_comments(self):
+        """
+        Map the key of each commented entry (or None for the end of the dictionary) to its comments
+        """
+        if self.jsonc_parent is _SHARED:
+            return types.MappingProxyType(self._comments or {})
+        if self._comments is None:
+            self._comments = {}
+        return self._comments
+
+    @jsonc_comments.setter
+    def jsonc_comments(self, comments):
+        _check_writable(self)
+        self._comments = comments
+        # the source text has the old comments, so the dictionary is written out again
+        self.jsonc_span = None
+        _mark_dirty(self)
+
+    @property
+    def jsonc_with_comments(self):
+        """
+        Build the dictionary with comments stored as `.jsonc_*` entries
+        """
+        return _with_comments(self)
 
     def __restore_types__(self, data=None, dtypes=None):
+        """
+        Turn the keys that fix_types stringified back into ints, bools and floats
+        """
         if data is None:
             return data
-        if dtypes is None:
-            dtypes = {}
-        if isinstance(data, dict) or isinstance(data, JSONCDict):
-            out = JSONCDict()
-            for k in data:
-                if isinstance(data[k], dict) or isinstance(data[k], JSONCDict):
-                    out[k] = self.__restore_types__(data[k], dtypes[k])
-                    continue
-                if isinstance(data[k], list) or isinstance(data[k], JSONCList):
-                    out[k] = self.__restore_types__(data[k], dtypes[k])
-                    continue
-                if dtypes[k] == 'int':
-                    out[int(k)] = data[k]
-                    continue
-                if dtypes[k] == 'bool':
-                    out[bool(k)] = data[k]
-                    continue
-                if dtypes[k] == 'float':
-                    out[float(k)] = data[k]
-                    continue
-                out[k] = data[k]
-            return out
-        if isinstance(data, list) or isinstance(data, JSONCList):
-            out = []
-            for i in range(0, len(data)):
-                if isinstance(data[i], dict) or isinstance(data[i], JSONCDict):
-                    out.append(self.__restore_types__(data[i], dtypes[i]))
-                    continue
-                if isinstance(data[i], list) or isinstance(data[i], JSONCList):
-                    out.append(self.__restore_types__(data[i], dtypes[i]))
-                    continue
-                out.append(data[i])
-            return out
+        if not isinstance(data, (dict, list, JSONCList)):
+            return None
+        # each container is put in its place in the output while it is still empty and filled in
+        # once it comes off the stack, so nesting is only limited by memory
+        top = JSONCDict() if isinstance(data, dict) else []
+        stack = [(data, dtypes, top)]
+        while stack:
+            data, dtypes, out = stack.pop()
+            if dtypes is None:
+                dtypes = {}
+            if isinstance(data, dict):
+                _check_keys(data)
+                for k, value in dict.items(data):
+                    if isinstance(value, dict):
+                        stack.append((value, dtypes[k], JSONCDict(out, k)))
+                        value = stack[-1][2]
+                    elif isinstance(value, (list, JSONCList)):
+                        stack.append((value, dtypes[k], []))
+                        value = stack[-1][2]
+                    elif dtypes[k] == 'int':
+                        k = int(k)
+                    elif dtypes[k] == 'bool':
+                        k = bool(k)
+                    elif dtypes[k] == 'float':
+                        k = float(k)
+                    dict.__setitem__(out, k, value)
+            else:
+                for i, value in enumerate(list.__iter__(data)):
+                    if isinstance(value, dict):
+                        stack.append((value, dtypes[i], JSONCDict()))
+                        value = stack[-1][2]
+                    elif isinstance(value, (list, JSONCList)):
+                        stack.append((value, dtypes[i], []))
+                        value = stack[-1][2]
+                    out.append(value)
+        return top
 
     @staticmethod
     def fix_types(data):
-        if isinstance(data, dict) or isinstance(data, JSONCDict):
-            out = JSONCDict()
-            dtypes = {}
-            for k in data:
-                if isinstance(data[k], dict) or isinstance(data[k], JSONCDict):
-                    out[k], dtypes[k] = JSONCDict.fix_types(data[k])
-                    continue
-                if isinstance(data[k], list) or isinstance(data[k], JSONCList):
-                    out[k], dtypes[k] = JSONCDict.fix_types(data[k])
-                    continue
-                if type(k) == int:
-                    out[str(k)] = data[k]
-                    dtypes[str(k)] = 'int'
-                    continue
-                if type(k) == bool:
-                    out[str(k)] = data[k]
-                    dtypes[str(k)] = 'bool'
-                    continue
-                if type(k) == float:
-                    out[str(k)] = data[k]
-                    dtypes[str(k)] = 'float'
-                    continue
-                out[k] = data[k]
-                dtypes[k] = str(type(data[k]))
-            return out, dtypes
-        if isinstance(data, list) or isinstance(data, JSONCList):
-            out = []
-            dtypes = []
-            for i in range(0, len(data)):
-                if isinstance(data[i], dict) or isinstance(data[i], JSONCDict):
-                    a, b = JSONCDict.fix_types(data[i])
-                    out.append(a)
-                    dtypes.append(b)
-                    continue
-                if isinstance(data[i], list) or isinstance(data[i], JSONCList):
-                    a, b = JSONCDict.fix_types(data[i])
-                    out.append(a)
-                    dtypes.append(b)
-                    continue
-                out.append(data[i])
-                dtypes.append('N/A')
-            return out, dtypes
+        """
+        Stringify the int, bool and float keys of a tree, returning it along with the tree of types
+        needed by __restore_types__ to turn them back
+        """
+        if not isinstance(data, (dict, list, JSONCList)):
+            return None
+        top = (JSONCDict(), {}) if isinstance(data, dict) else ([], [])
+        stack = [(data,) + top]
+        while stack:
+            data, out, dtypes = stack.pop()
+            if isinstance(data, dict):
+                _check_keys(data)
+                for k, value in dict.items(data):
+                    if isinstance(value, dict):
+                        dtypes[k] = {}
+                        stack.append((value, JSONCDict(out, k), dtypes[k]))
+                        value = stack[-1][1]
+                    elif isinstance(value, (list, JSONCList)):
+                        dtypes[k] = []
+                        stack.append((value, [], dtypes[k]))
+                        value = stack[-1][1]
+                    elif type(k) == str:
+                        dtypes[k] = str(type(value))
+                    elif type(k) == int:
+                        k = str(k)
+                        dtypes[k] = 'int'
+                    elif type(k) == bool:
+                        k = str(k)
+                        dtypes[k] = 'bool'
+                    elif type(k) == float:
+                        k = str(k)
+                        dtypes[k] = 'float'
+                    else:
+                        dtypes[k] = str(type(value))
+                    dict.__setitem__(out, k, value)
+            else:
+                for value in list.__iter__(data):
+                    if isinstance(value, dict):
+                        stack.append((value, JSONCDict(), {}))
+                    elif isinstance(value, (list, JSONCList)):
+                        stack.append((value, [], []))
+                    else:
+                        out.append(value)
+                        dtypes.append('N/A')
+                        continue
+                    out.append(stack[-1][1])
+                    dtypes.append(stack[-1][2])
+        return top
 
     def __setitem__(self, key, value):
         """
@@ -117,372 +201,3307 @@ class JSONCDict(dict):
         invalid_keys = ['jsonc_key', 'jsonc_with_comments', 'jsonc_parent']
         if key in invalid_keys:
             raise KeyError(f'Key "{key}" in not allowed for a JSONCDict')
+        _check_writable(self)
+        if self.jsonc_span is not None:
+            _record_edit(self, key, key in self)
+        old = dict.get(self, key, _MISSING)
+        value = _attach(self, key, value)
 
         super(JSONCDict, self).__setitem__(key, value)
-        # add the value to the with comments dictionary
-
-        # handle if a dictionary was handed back
-        if type(value) == JSONCDict or type(value) == JSONCList:
-            self.jsonc_with_comments.__setitem__(key, value.jsonc_with_comments)
-        else:
-            self.jsonc_with_comments.__setitem__(key, value)
 
-        if self.jsonc_parent != None:
-            self.jsonc_parent.__setitem__(self.jsonc_key, self)
+        if old is not value:
+            _detach(self, key, (old,))
+        _mark_dirty(self)
+        if _indexed:
+            if old is not _MISSING:
+                _index_remove(self, _MISSING, (old,))
+            _index_add(self, key if old is _MISSING else _MISSING, (key,))
 
     def __delitem__(self, key):
         """
         Delete an item from the dictionary
         """
+        _check_writable(self)
+        old = super(JSONCDict, self).__getitem__(key)
         super(JSONCDict, self).__delitem__(key)
+        _detach(self, key, (old,))
+        if _indexed:
+            _index_remove(self, key, (old,))
+        # comments attached to the entry go with it
+        if self._comments:
+            self._comments.pop(key, None)
+        self.jsonc_span = None
+        _mark_dirty(self)
 
     def __getitem__(self, key):
         """
         Get an item from the dictionary
         """
         out = super(JSONCDict, self).__getitem__(key)
-        # handle dictionaries being passed without changes being reflected back in the JSONCDict
-        if type(out) == dict:
-            out_fixed, out_dtypes = JSONCDict.fix_types(out)
-            out = JSONCDict(parent=self, jsonc_key=key, jsonc_dtypes=out_dtypes, **out_fixed)
-            out = self.__restore_types__(data=out, dtypes=out_dtypes)
-            out.jsonc_with_comments = self.jsonc_with_comments.__getitem__(key)
-            return out
-        elif type(out) == list:
-            out = JSONCList(data=out)
-            out.jsonc_with_comments = self.jsonc_with_comments.__getitem__(key)
-            return out
-        elif type(out) == JSONCDict:
-            out.jsonc_parent = self
-            out.jsonc_key = key
-            out.jsonc_with_comments = self.jsonc_with_comments.__getitem__(key)
-            return out
-        elif type(out) == JSONCList:
-            out.jsonc_parent = self
-            out.jsonc_key = key
-            out.jsonc_with_comments = self.jsonc_with_comments.__getitem__(key)
-            return out
-        else:
-            return out
+        # convert plain containers once and keep the node in their place so that changes are
+        # reflected back in the JSONCDict and later reads return the same object
+        if type(out) == dict or type(out) == list:
+            out = _to_node(out, self, key)
+            super(JSONCDict, self).__setitem__(key, out)
+        elif ((type(out) == JSONCDict or type(out) == JSONCList) and out.jsonc_parent is _SHARED
+              and self.jsonc_parent is not _SHARED):
+            out = _copy_shared(out, self, key)
+            super(JSONCDict, self).__setitem__(key, out)
+        return out
 
     def clear(self):
         """
         Clear the dictionary
         """
+        _check_writable(self)
+        items = list(dict.items(self))
         super(JSONCDict, self).clear()
+        for key, value in items:
+            _detach(self, key, (value,))
+            if _indexed:
+                _index_remove(self, key, (value,))
         # clear the internal variables
-        self.jsonc_with_comments = {}
+        self._comments = None
+        self.jsonc_span = None
+        _mark_dirty(self)
+
+    def pop(self, key, *default):
+        """
+        Remove an item from the dictionary and return its value
+        """
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = self[key]
+        del self[key]
+        return value
+
+    def popitem(self):
+        """
+        Remove the last item from the dictionary and return it
+        """
+        if not self:
+            raise KeyError('popitem(): dictionary is empty')
+        key = next(reversed(dict.keys(self)))
+        return key, self.pop(key)
+
+    # the values are read through __getitem__ so that plain containers are converted and frozen
+    # ones are copied, as they are when read one at a time. Overriding __iter__ makes dict() and
+    # ** do the same
+    def __iter__(self):
+        return dict.__iter__(self)
+
+    def items(self):
+        """
+        Get a view of the items of the dictionary
+        """
+        return _ItemsView(self)
+
+    def values(self):
+        """
+        Get a view of the values of the dictionary
+        """
+        return _ValuesView(self)
+
+    def copy(self):
+        """
+        Get a shallow copy of the dictionary as a plain dict
+        """
+        return dict(self)
+
+    def setdefault(self, key, default=None):
+        """
+        Get an item from the dictionary, setting it to default first if it does not exist
+        """
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        """
+        Set several items in the dictionary at once
+        """
+        with self.batch():
+            for key, value in dict(*args, **kwargs).items():
+                self[key] = value
 
-def indexing_decorator(func):
+    def __ior__(self, other):
+        self.update(other)
+        return self
 
-    def decorated(self, index, *args):
-        return func(self, index, *args)
+    def batch(self):
+        """
+        Group changes so that the ancestors of changed nodes are only marked once
+        """
+        return _batch()
+
+    def get(self, key, default=None):
+        """
+        Get an item from the dictionary if it exists
+        """
+        if key in self:
+            return self[key]
+        return default
+
+    def __reduce__(self):
+        """
+        Pickle the dictionary as plain containers and a table of comments
+        """
+        return _unpack, (_pack(self),)
+
+    def get_path(self, path, default=_MISSING):
+        """
+        Get the value at a path such as `a.b[3].c`, raising KeyError if there is none and no default
+        """
+        return _get_path(self, path, default)
+
+    def find(self, path):
+        """
+        Get the values matching a JSONPath such as `$..timeout` or `$.servers[*].port`
+
+        Searching for a key with `$..key` uses an index of the keys below the dictionary that is
+        built on first use and kept up to date as the data changes. Matches come in document order,
+        except that ones added or moved after the index was built come last
+        """
+        return _find(self, path)
+
+
+    def freeze(self):
+        """
+        Get a read-only and hashable snapshot of the dictionary
+
+        Reading a snapshot never changes it, so it can be read from many threads at once without
+        locks. The frozen parts of the dictionary, such as the ones of a thawed snapshot that have not
+        been read since, are shared with the snapshot instead of being copied
+        """
+        return _freeze(self)
+
+    def thaw(self):
+        """
+        Get a copy of a frozen dictionary that can be changed, which is made as its parts are read
+
+        Unchanged parts stay shared with the snapshot, and with the next one taken by freeze
+        """
+        if self.jsonc_parent is not _SHARED:
+            return self
+        return _view(self)
+
+    def __hash__(self):
+        if self._hash is None:
+            raise TypeError(f"unhashable type: '{type(self).__name__}', use freeze() to get a hashable snapshot")
+        return self._hash
+
+    def apply_patch(self, patch):
+        """
+        Apply a JSON Patch (RFC 6902) such as the ones made by diff, changing the dictionary in place
+
+        Values that are not changed keep their nodes and comments. Operations before one that
+        fails stay applied. Once the patch is applied, or has failed, each subscriber is called with
+        the applied operations that changed its path
+        """
+        _apply_patch(self, patch)
+
+    def subscribe(self, path, callback):
+        """
+        Call callback with the list of operations of each applied patch that change the value at
+        a JSON Pointer such as `/servers/0`, including changes above or below it
+        """
+        _check_writable(self)
+        if self._subscribers is None:
+            self._subscribers = []
+        self._subscribers.append((path, _pointer(path), callback))
 
-    return decorated
+    def unsubscribe(self, path, callback):
+        """
+        Stop calling a callback given to subscribe
+        """
+        for entry in self._subscribers or ():
+            if entry[0] == path and entry[2] == callback:
+                self._subscribers.remove(entry)
+                return
+        raise ValueError(f'{callback!r} is not subscribed to "{path}"')
+
+class _ItemsView(collections.abc.ItemsView):
+    """
+    Items of a JSONCDict, with the containers read through __getitem__
+    """
+    __slots__ = ()
+
+    def __iter__(self):
+        node = self._mapping
+        for key, value in dict.items(node):
+            if type(value) in _CONTAINER_TYPES:
+                value = node[key]
+            yield key, value
+
+class _ValuesView(collections.abc.ValuesView):
+    """
+    Values of a JSONCDict, with the containers read through __getitem__
+    """
+    __slots__ = ()
+
+    def __iter__(self):
+        node = self._mapping
+        for key, value in dict.items(node):
+            if type(value) in _CONTAINER_TYPES:
+                value = node[key]
+            yield value
+
+# a list subclass so that the data can be given to json.dumps and other code expecting plain
+# containers, the mixins of MutableSequence come first so that changes go through the methods below
+class JSONCList(collections.abc.MutableSequence, list):
+    __slots__ = ('_comment_slots', '_root_comments', 'jsonc_parent', 'jsonc_key', 'jsonc_dirty',
+                 'jsonc_source', 'jsonc_span', 'jsonc_edits', '_held', '_index', '_subscribers', '_hash')
 
-class JSONCList(collections.abc.MutableSequence):
     def __init__(self, data=None, parent=None, key=None):
-        if data is None:
-            data = []
-        self._inner_list = data
-        self.jsonc_with_comments = []
+        if data is not None:
+            list.__init__(self, data)
+        # comments are kept in slots aligned with the items, slot i holds the comments of item i
+        # and the extra last slot holds the ones at the end of the list. The slots are only
+        # allocated once the list has comments and are moved together with the items, so the
+        # index of an item is also the index of its comments
+        self._comment_slots = None
+        # the comments before and after the list when it is the root of a document
+        self._root_comments = None
         self.jsonc_parent = parent
         self.jsonc_key = key
+        # set once the list or anything below it has been changed
+        self.jsonc_dirty = False
+        # source of the list and the indexes replaced since, see JSONCDict
+        self.jsonc_source = None
+        self.jsonc_span = None
+        self.jsonc_edits = None
+        # how many times each node held more than once is in the list, by id
+        self._held = None
+        self._index = None
+        self._subscribers = None
+        self._hash = None
 
-    def __len__(self):
-        return len(self._inner_list)
+    @property
+    def jsonc_comments(self):
+        """
+        Map the index of each commented item (or None for the end of the list) to its comments
+        """
+        slots = self._comment_slots
+        if slots is None:
+            return {}
+        out = {index: comments for index, comments in enumerate(slots) if comments}
+        if len(self) in out:
+            out[None] = out.pop(len(self))
+        return out
+
+    @jsonc_comments.setter
+    def jsonc_comments(self, comments):
+        _check_writable(self)
+        self._comment_slots = _comment_slots(len(self), comments)
+        self.jsonc_span = None
+        _mark_dirty(self)
+
+    @property
+    def jsonc_with_comments(self):
+        """
+        Build the list with comments stored as `.jsonc_*` items
+        """
+        return _with_comments(self)
+
+    __len__ = list.__len__
+
+    def __iter__(self):
+        for index, value in enumerate(list.__iter__(self)):
+            if type(value) in _CONTAINER_TYPES:
+                value = self[index]
+            yield value
+
+    def __contains__(self, value):
+        return list.__contains__(self, value)
 
-    @indexing_decorator
     def __delitem__(self, index):
-        self._inner_list.__delitem__(index)
-        self.jsonc_with_comments.__delitem__(self.find_comment_index(index))
+        _check_writable(self)
+        length = len(self)
+        old = list.__getitem__(self, index)
+        if type(index) != slice:
+            old = (old,)
+        list.__delitem__(self, index)
+        _detach(self, None, old)
+        self.jsonc_span = None
+        _mark_dirty(self)
+        if _indexed:
+            _index_remove(self, _MISSING, old)
+        slots = self._comment_slots
+        if slots is None:
+            return
+        if type(index) != slice:
+            slots.__delitem__(index if index >= 0 else index + length)
+            return
+        start, stop, step = index.indices(length)
+        if step == 1:
+            slots.__delitem__(slice(start, stop))
+        else:
+            removed = set(range(start, stop, step))
+            self._comment_slots = [slot for i, slot in enumerate(slots) if i not in removed]
 
-    @indexing_decorator
     def insert(self, index, value):
-        self._inner_list.insert(index, value)
-        self.jsonc_with_comments.insert(self.find_comment_index(index), value)
+        _check_writable(self)
+        length = len(self)
+        position = min(max(index + length, 0) if index < 0 else index, length)
+        list.insert(self, position, _attach(self, position, value))
+        self.jsonc_span = None
+        _mark_dirty(self)
+        if self._comment_slots is not None:
+            self._comment_slots.insert(position, None)
+        if _indexed:
+            _index_add(self, _MISSING, (position,))
 
-    @indexing_decorator
     def __setitem__(self, index, value):
-        self._inner_list.__setitem__(index, value)
-
-        if type(value) == JSONCDict or type(value) == JSONCList:
-            self.jsonc_with_comments.__setitem__(self.find_comment_index(index), value.jsonc_with_comments)
+        _check_writable(self)
+        if self.jsonc_span is not None:
+            if type(index) == slice:
+                self.jsonc_span = None
+            else:
+                length = len(self)
+                _record_edit(self, index + length if index < 0 else index, -length <= index < length)
+        if type(index) == slice:
+            # the new values are walked again once they are in place
+            value = list(value)
+            for item in value:
+                if (type(item) == JSONCDict or type(item) == JSONCList) and item.jsonc_parent is self:
+                    _hold(self, item)
+        old = list.__getitem__(self, index)
+        if type(index) != slice:
+            old = (old,)
+        length = len(self)
+        if type(index) == slice and self._comment_slots is not None:
+            length = len(self)
+            start, stop, step = index.indices(length)
+            list.__setitem__(self, index, value)
+            if step == 1:
+                # the replaced items take their comments with them
+                stop = max(start, stop)
+                self._comment_slots[start:stop] = [None] * (len(self) - length + stop - start)
         else:
-            self.jsonc_with_comments.__setitem__(self.find_comment_index(index), value)
+            value = _attach(self, index, value)
+            list.__setitem__(self, index, value)
 
-        if self.jsonc_parent != None:
-            self.jsonc_parent.__setitem__(self.jsonc_key, self)
+        _detach(self, None, old)
+        _mark_dirty(self)
+        if _indexed:
+            _index_remove(self, _MISSING, old)
+            if type(index) == slice:
+                start, stop, step = index.indices(length)
+                _index_add(self, _MISSING, range(start, start + len(value)) if step == 1 else range(start, stop, step))
+            else:
+                _index_add(self, _MISSING, (index,))
 
-    @indexing_decorator
     def __getitem__(self, index):
-        out = self._inner_list.__getitem__(index)
+        out = list.__getitem__(self, index)
 
-        if type(out) == dict:
-            out = JSONCDict(parent=self, jsonc_key=index, **out)
-            out.jsonc_with_comments = self.jsonc_with_comments.__getitem__(self.find_comment_index(index))
-            return out
-        elif type(out) == list:
+        if type(index) == slice:
             out = JSONCList(data=out)
-            out.jsonc_with_comments = self.jsonc_with_comments.__getitem__(self.find_comment_index(index))
-            return out
-        elif type(out) == JSONCDict:
-            out.jsonc_parent = self
-            out.jsonc_key = index
-            out.jsonc_with_comments = self.jsonc_with_comments.__getitem__(self.find_comment_index(index))
-            return out
-        elif type(out) == JSONCList:
-            out.jsonc_parent = self
-            out.jsonc_key = index
-            out.jsonc_with_comments = self.jsonc_with_comments.__getitem__(self.find_comment_index(index))
-            return out
-        else:
+            slots = self._comment_slots
+            if slots is not None:
+                out._comment_slots = [slots[i] for i in range(*index.indices(len(self)))]
+                out._comment_slots.append(None)
             return out
+        # convert plain containers once and keep the node in their place
+        if type(out) == dict or type(out) == list:
+            out = _to_node(out, self, index)
+            list.__setitem__(self, index, out)
+        elif ((type(out) == JSONCDict or type(out) == JSONCList) and out.jsonc_parent is _SHARED
+              and self.jsonc_parent is not _SHARED):
+            out = _copy_shared(out, self, index)
+            list.__setitem__(self, index, out)
+        return out
 
     def append(self, value):
-        self.insert(len(self) + 1, value)
+        self.insert(len(self), value)
 
-    def __str__(self):
-        return str(self._inner_list)
+    def copy(self):
+        """
+        Get a shallow copy of the list as a plain list
+        """
+        return list(self)
 
-    def __repr__(self):
-        return str(self._inner_list)
-
-    def find_comment_index(self, index):
-        counter = 0
-        idx = 0
-        while idx < index:
-            if counter == len(self.jsonc_with_comments):
-                return counter + 1
-            if type(self.jsonc_with_comments[counter]) != str:
-                idx += 1
-            elif not self.jsonc_with_comments[counter].startswith('.jsonc'):
-                idx += 1
-            counter += 1
-        return counter
+    def sort(self, *, key=None, reverse=False):
+        """
+        Sort the list in place, the items take their comments with them
+        """
+        _check_writable(self)
+        items = list.copy(self)
+        order = sorted(range(len(items)), key=lambda i: items[i] if key is None else key(items[i]), reverse=reverse)
+        # the slice assignment clears the slots in place, so they are read first
+        slots = self._comment_slots and list(self._comment_slots)
+        self[:] = [items[i] for i in order]
+        if slots is not None:
+            self._comment_slots = [slots[i] for i in order] + [slots[-1]]
 
-def handle_block_newlines(text: str) -> str:
+    def reverse(self):
+        """
+        Reverse the list in place, the items take their comments with them
+        """
+        _check_writable(self)
+        slots = self._comment_slots and list(self._comment_slots)
+        self[:] = list.copy(self)[::-1]
+        if slots is not None:
+            self._comment_slots = slots[-2::-1] + [slots[-1]]
+
+    def __imul__(self, count):
+        if count <= 0:
+            del self[:]
+        else:
+            self.extend(list.copy(self) * (count - 1))
+        return self
+
+    def batch(self):
+        """
+        Group changes so that the ancestors of changed nodes are only marked once
+        """
+        return _batch()
+
+    def __reduce__(self):
+        """
+        Pickle the list as plain containers and a table of comments
+        """
+        return _unpack, (_pack(self),)
+
+    def get_path(self, path, default=_MISSING):
+        """
+        Get the value at a path such as `[3].c`, see JSONCDict.get_path
+        """
+        return _get_path(self, path, default)
+
+    def find(self, path):
+        """
+        Get the values matching a JSONPath, see JSONCDict.find
+        """
+        return _find(self, path)
+
+
+    def freeze(self):
+        """
+        Get a read-only and hashable snapshot of the list
+
+        Reading a snapshot never changes it, so it can be read from many threads at once without
+        locks. The frozen parts of the list, such as the ones of a thawed snapshot that have not
+        been read since, are shared with the snapshot instead of being copied
+        """
+        return _freeze(self)
+
+    def thaw(self):
+        """
+        Get a copy of a frozen list that can be changed, which is made as its parts are read
+
+        Unchanged parts stay shared with the snapshot, and with the next one taken by freeze
+        """
+        if self.jsonc_parent is not _SHARED:
+            return self
+        return _view(self)
+
+    def __hash__(self):
+        if self._hash is None:
+            raise TypeError(f"unhashable type: '{type(self).__name__}', use freeze() to get a hashable snapshot")
+        return self._hash
+
+    def apply_patch(self, patch):
+        """
+        Apply a JSON Patch (RFC 6902) such as the ones made by diff, changing the list in place
+
+        Values that are not changed keep their nodes and comments. Operations before one that
+        fails stay applied. Once the patch is applied, or has failed, each subscriber is called with
+        the applied operations that changed its path
+        """
+        _apply_patch(self, patch)
+
+    def subscribe(self, path, callback):
+        """
+        Call callback with the list of operations of each applied patch that change the value at
+        a JSON Pointer such as `/servers/0`, including changes above or below it
+        """
+        _check_writable(self)
+        if self._subscribers is None:
+            self._subscribers = []
+        self._subscribers.append((path, _pointer(path), callback))
+
+    def unsubscribe(self, path, callback):
+        """
+        Stop calling a callback given to subscribe
+        """
+        for entry in self._subscribers or ():
+            if entry[0] == path and entry[2] == callback:
+                self._subscribers.remove(entry)
+                return
+        raise ValueError(f'{callback!r} is not subscribed to "{path}"')
+
+_CONTAINER_TYPES = (dict, list, JSONCDict, JSONCList)
+
+# parent of the nodes of a tree shared between the callers of load_cached, such nodes can not be
+# changed and are copied into the tree that reads them instead
+_SHARED = object()
+
+def _comment_slots(length, comments):
     """
-    Replace newlines inside of block comments
+    Turn a table of list comments by index into the slots of a list of length items
     """
+    if not comments:
+        return None
+    slots = [None] * (length + 1)
+    for index, value in comments.items():
+        if index is None or index >= length:
+            index = length
+        slots[index] = value
+    return slots
 
-    look_behind = ''
-    look_ahead = ''
-    windows_replace_indices = []
-    linux_replace_indices = []
-    in_c_block_comment = False
-    for index, character in enumerate(text):
-        if index < len(text) - 1:
-            look_ahead = text[index + 1]
-        else:
-            look_ahead = ''
-        if character == '*' and look_behind == '/':
-            in_c_block_comment = True
-        elif character == '*' and look_ahead == '/':
-            in_c_block_comment = False
-        else:
-            if in_c_block_comment:
-                if character == '\n':
-                    if look_behind == '\r':
-                        windows_replace_indices.append(index-1)
-                    else:
-                        linux_replace_indices.append(index)
-        look_behind = character
-
-    windows_replace_indices.reverse()
-    linux_replace_indices.reverse()
-
-    while len(windows_replace_indices) > 0 or len(linux_replace_indices) > 0:
-        idx = 0
-        source = 'windows'
-        if len(windows_replace_indices) > 0:
-            idx = windows_replace_indices[0]
-        if len(linux_replace_indices) > 0:
-            if linux_replace_indices[0] > idx:
-                idx = linux_replace_indices[0]
-                source = 'linux'
-        if source == 'linux':
-            text = text[:idx] + '<JSONC_LINUX_NEWLINE>' + text[idx+1:]
-            linux_replace_indices.pop(0)
+def _attach(container, key, value):
+    """
+    Make a container the parent of a node set in it, returning the value to store
+
+    A frozen node is copied, as it is when read through __getitem__, so that the snapshot it
+    belongs to does not change. A node that is also in another tree is only marked dirty through
+    its new parent, so the tree it came from is marked now to keep its incremental dumps from
+    copying the old source text
+    """
+    if type(value) == JSONCDict or type(value) == JSONCList:
+        if value.jsonc_parent is _SHARED:
+            return _copy_shared(value, container, key)
+        previous = value.jsonc_parent
+        if type(container) == JSONCList:
+            if previous is container:
+                _hold(container, value)
+            elif container._held is not None:
+                # left over from a node that was moved away or collected since
+                container._held.pop(id(value), None)
+        if previous is not None and previous is not container and previous is not _SHARED:
+            _mark_dirty(previous)
+        value.jsonc_parent = container
+        value.jsonc_key = key
+    return value
+
+def _hold(container, value):
+    """
+    Count one more place of a list holding a node that is already in it
+    """
+    if container._held is None:
+        container._held = {}
+    container._held[id(value)] = container._held.get(id(value), 1) + 1
+
+def _check_writable(node):
+    """
+    Make sure a node is not shared before changing it
+    """
+    if node.jsonc_parent is _SHARED:
+        raise TypeError('This node is frozen, use thaw() or read it through a parent that is not frozen to get a copy that can be changed')
+
+def _record_edit(node, key, replaced):
+    """
+    Note that the value of key was replaced, or that the entries of the node changed otherwise
+    """
+    if not replaced:
+        node.jsonc_span = None
+    elif node.jsonc_edits is None:
+        node.jsonc_edits = {key}
+    else:
+        node.jsonc_edits.add(key)
+
+def _copy_shared(node, parent, key):
+    """
+    Copy one shared node, its children stay shared until they are read in turn
+    """
+    if type(node) == JSONCDict:
+        out = JSONCDict(parent=parent, jsonc_key=key)
+        dict.update(out, dict.items(node))
+        if node._comments:
+            out._comments = {k: list(v) for k, v in node._comments.items()}
+    else:
+        out = JSONCList(data=list.copy(node), parent=parent, key=key)
+        if node._comment_slots is not None:
+            out._comment_slots = [None if slot is None else list(slot) for slot in node._comment_slots]
+    if node._root_comments is not None:
+        out._root_comments = (list(node._root_comments[0]), list(node._root_comments[1]))
+    # the source text is never changed so it can be shared as well
+    out.jsonc_source = node.jsonc_source
+    out.jsonc_span = node.jsonc_span
+    return out
+
+def _mark_dirty(node):
+    """
+    Mark a node and its ancestors as changed
+    """
+    pending = getattr(_local, 'batch', None)
+    if pending is not None:
+        pending[id(node)] = node
+        return
+    # a dirty node always has dirty ancestors, so the walk can stop at the first one
+    depth = 0
+    while node is not None and not node.jsonc_dirty:
+        node.jsonc_dirty = True
+        node = node.jsonc_parent
+        depth += 1
+    if _profiler is not None:
+        _profiler('mark_dirty', {'depth': depth})
+
+@contextlib.contextmanager
+def _batch():
+    """
+    Collect the nodes changed inside of the block and mark them once on exit
+    """
+    if getattr(_local, 'batch', None) is not None:
+        # nested batches are flushed by the outermost one
+        yield
+        return
+    pending = _local.batch = {}
+    try:
+        yield
+    finally:
+        _local.batch = None
+        for node in pending.values():
+            _mark_dirty(node)
+
+def _detach(container, key, values):
+    """
+    Clear the parent of the nodes taken out of a container, so that later changes to them do not
+    reach it. A node that is still in the container, such as one moved to another key, keeps it
+    """
+    for value in values:
+        if (type(value) != JSONCDict and type(value) != JSONCList) or value.jsonc_parent is not container:
+            continue
+        if type(container) == JSONCDict:
+            # a dictionary entry set since holds the node at its new key
+            if value.jsonc_key != key:
+                continue
+        elif container._held is not None and id(value) in container._held:
+            # list items do not keep their index up to date, so the list counts the nodes it
+            # holds more than once instead
+            count = container._held.pop(id(value)) - 1
+            if count > 1:
+                container._held[id(value)] = count
+            continue
+        value.jsonc_parent = None
+        value.jsonc_key = None
+
+def _indexes_above(node):
+    """
+    Get the key indexes of a node and its ancestors
+    """
+    out = []
+    while node is not None and node is not _SHARED:
+        if node._index is not None:
+            out.append(node._index)
+        node = node.jsonc_parent
+    return out
+
+def _index_walk(index, node, add):
+    """
+    Add or remove the dictionaries below node to or from a key index, in document order
+
+    The index counts how many times each node is held in the tree, a node held in several places
+    is only walked when the first one is added and when the last one is removed
+    """
+    keys, counts = index
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if type(node) != JSONCDict and type(node) != JSONCList:
+            continue
+        count = counts.get(id(node), 0) + (1 if add else -1)
+        if count > 0:
+            counts[id(node)] = count
         else:
-            text = text[:idx] + '<JSONC_WINDOWS_NEWLINE>' + text[idx+2:]
-            windows_replace_indices.pop(0)
+            counts.pop(id(node), None)
+        if count != (1 if add else 0):
+            continue
+        children = []
+        if type(node) == JSONCDict:
+            for key in list(dict.keys(node)):
+                if add:
+                    keys.setdefault(key, {})[id(node)] = node
+                    value = node[key]
+                else:
+                    keys.get(key, {}).pop(id(node), None)
+                    value = dict.__getitem__(node, key)
+                if type(value) == JSONCDict or type(value) == JSONCList:
+                    children.append(value)
+        elif type(node) == JSONCList:
+            for position in range(len(node)):
+                value = node[position] if add else list.__getitem__(node, position)
+                if type(value) == JSONCDict or type(value) == JSONCList:
+                    children.append(value)
+        stack.extend(reversed(children))
 
-    return text
+def _index_add(container, key, positions):
+    """
+    Add a new key of a container and the values at positions to the indexes above it
+    """
+    indexes = _indexes_above(container)
+    for index in indexes:
+        if key is not _MISSING:
+            index[0].setdefault(key, {})[id(container)] = container
+        for position in positions:
+            _index_walk(index, container[position], True)
+
+def _index_remove(container, key, values):
+    """
+    Remove a key of a container and the values taken out of it from the indexes above it
+    """
+    indexes = _indexes_above(container)
+    for index in indexes:
+        if key is not _MISSING:
+            index[0].get(key, {}).pop(id(container), None)
+        for value in values:
+            _index_walk(index, value, False)
 
-def load(stream):
+def _key_index(node):
     """
-    Initialize a JSONCDict from a file
+    Get the index mapping each key below node to the dictionaries holding it, building it if needed
     """
-    data = stream.read()
-    return loads(data)
+    global _indexed
+    if node._index is None:
+        # the keys along with the number of times each node is held, see _index_walk
+        index = ({}, {})
+        _index_walk(index, node, True)
+        node._index = index
+        _indexed = True
+    return node._index[0]
 
-def loads(text):
+_PATH_STEP = re.compile(r'''\.\.(\*|[^.\[\]]+)|\.(\*|[^.\[\]]+)|\[(\*|-?\d+|'[^']*'|"[^"]*")\]''')
+
+@functools.lru_cache(maxsize=256)
+def _compile_path(path):
     """
-    Initialize a JSONCDict from a string
+    Split a path such as `$.a.b[3]..c` into (kind, name) steps, kind being 'child' or 'descend'
+    and name being a key, an index or '*'
     """
-    
-    text = handle_block_newlines(text)
+    if path.startswith('$'):
+        path = path[1:]
+    elif path and path[0] != '[' and path[0] != '.':
+        path = '.' + path
+    steps = []
+    pos = 0
+    while pos < len(path):
+        match = _PATH_STEP.match(path, pos)
+        if match is None:
+            raise ValueError(f'Invalid path "{path}" at position {pos}')
+        descend, name, bracket = match.groups()
+        if bracket is not None:
+            if bracket[0] == "'" or bracket[0] == '"':
+                name = bracket[1:-1]
+            elif bracket == '*':
+                name = bracket
+            else:
+                name = int(bracket)
+        steps.append(('descend', descend) if descend is not None else ('child', name))
+        pos = match.end()
+    return tuple(steps)
 
-    lines = text.split('\n')
-    lines = [l for l in lines if not len(l.strip()) == 0]
+def _get_path(node, path, default):
+    """
+    Follow a path of keys and indexes from node
+    """
+    for kind, name in _compile_path(path):
+        if kind != 'child' or name == '*':
+            raise ValueError(f'Path "{path}" has to name a single value, use find to search')
+        try:
+            if isinstance(node, dict) if type(name) == str else type(node) == JSONCList:
+                node = node[name]
+                continue
+        except (KeyError, IndexError):
+            pass
+        if default is _MISSING:
+            raise KeyError(path)
+        return default
+    return node
 
-    single_line_patterns = {
-        'c': '(?:^|[ \t])+\/\/((?:[^"]*"[^"]")*[^"]*(?:$))',
-        'python': '(?:^|[ \t])+#((?:[^"]*"[^"]")*[^"]*(?:$))'
-    }
+def _children(node):
+    """
+    Get the values directly below a node
+    """
+    if isinstance(node, dict):
+        return [node[key] for key in list(dict.keys(node))]
+    if type(node) == JSONCList:
+        return list(node)
+    return []
 
-    inline_patterns = {
-        'c': '((?:^|[ \t])[^ \t\n]+[ \t]*)\/\/((?:[^"]*"[^"]")*[^"]*(?:$))',
-        'python': '((?:^|[ \t])[^ \t\n]+[ \t]*)#((?:[^"]*"[^"]")*[^"]*(?:$))'
-    }
+def _find(node, path):
+    """
+    Get the values matching a path, see JSONCDict.find
+    """
+    current = [node]
+    for step, (kind, name) in enumerate(_compile_path(path)):
+        out = []
+        if (kind == 'descend' and step == 0 and name != '*' and (type(node) == JSONCDict or type(node) == JSONCList)
+                and node.jsonc_parent is not _SHARED):
+            # searching for a key from the start only needs the dictionaries holding it
+            out = [holder[name] for holder in _key_index(node).get(name, {}).values()]
+        elif kind == 'descend':
+            for value in current:
+                stack = [value]
+                while stack:
+                    value = stack.pop()
+                    if name == '*':
+                        children = _children(value)
+                        out.extend(children)
+                    else:
+                        if isinstance(value, dict) and name in value:
+                            out.append(value[name])
+                        children = _children(value)
+                    stack.extend(reversed([child for child in children if isinstance(child, _CONTAINER_TYPES)]))
+        else:
+            for value in current:
+                if name == '*':
+                    out.extend(_children(value))
+                elif type(name) == str and isinstance(value, dict):
+                    if name in value:
+                        out.append(value[name])
+                elif type(name) == int and type(value) == JSONCList:
+                    if -len(value) <= name < len(value):
+                        out.append(value[name])
+        current = out
+    return current
 
-    block_patterns = {
-        'c': '(?:^|[ \t])+\/\*((?:(?:(?!\/\*).)|\n|\r)*)\*\/(?:(?:[^"]*"[^"]")*[^"]*(?:$))'
-        # 'c': '(?:^|[ \t])+\/\*(((?!\/\*).)|\n|\r)*\*\/',
-        # 'python_double': '(?:^|[ \t])+"""(((?!""").)|\n|\r)*"""',
-        # 'python_single': '(?:^|[ \t])+\'\'\'(((?!\'\'\').)|\n|\r)*\'\'\'',
-        # 'html': '(?:^|[ \t])+<!--(((?!<!--).)|\n|\r)*-->'
-    }
+def _pointer(path):
+    """
+    Split a JSON Pointer into its unescaped tokens
+    """
+    if path == '':
+        return []
+    if path[0] != '/':
+        raise ValueError(f'Path "{path}" is not a JSON Pointer, it has to be empty or start with "/"')
+    return [token.replace('~1', '/').replace('~0', '~') for token in path[1:].split('/')]
 
-    list_start_pattern = r'\[(?=([^"\\]*(\\.|"([^"\\]*\\.)*[^"\\]*"))*[^"]*$)'
-    list_end_pattern = r'\](?=([^"\\]*(\\.|"([^"\\]*\\.)*[^"\\]*"))*[^"]*$)'
-    map_start_pattern = r'\{(?=([^"\\]*(\\.|"([^"\\]*\\.)*[^"\\]*"))*[^"]*$)'
-    map_end_pattern = r'\}(?=([^"\\]*(\\.|"([^"\\]*\\.)*[^"\\]*"))*[^"]*$)'
+def _pointer_token(key):
+    """
+    Escape a key for a JSON Pointer
+    """
+    if type(key) != str:
+        key = _encode_key(key)[1:-1]
+    return key.replace('~', '~0').replace('/', '~1')
 
-    list_count = 0
-    map_count = 1
+_INDEX_TOKEN = re.compile(r'0|[1-9][0-9]*')
 
-    for i in range(1, len(lines) - 1):
-        l = lines[i]
+def _list_index(token, length, path, end=False):
+    """
+    Get the list index a JSON Pointer token names, which can be the length or "-" when end is set
+    """
+    if end and token == '-':
+        return length
+    if _INDEX_TOKEN.fullmatch(token) is None or int(token) > length or (int(token) == length and not end):
+        raise KeyError(path)
+    return int(token)
 
-        if re.search(list_start_pattern, l):
-            list_count += 1
-        if re.search(list_end_pattern, l):
-            list_count -= 1
-        if re.search(map_start_pattern, l):
-            map_count += 1
-        if re.search(map_end_pattern, l):
-            map_count -= 1
+def _pointer_parent(root, tokens, path):
+    """
+    Follow all but the last token of a JSON Pointer, returning the node it ends on
+    """
+    node = root
+    for token in tokens[:-1]:
+        if isinstance(node, dict) and token in node:
+            node = node[token]
+        elif type(node) == JSONCList:
+            node = node[_list_index(token, len(node), path)]
+        else:
+            raise KeyError(path)
+    if not isinstance(node, dict) and type(node) != JSONCList:
+        raise KeyError(path)
+    return node
 
-        for k in inline_patterns:
-            if re.search(inline_patterns[k], l):
-                if map_count > list_count:
-                    l = re.sub(inline_patterns[k], '\\1\n".jsonc_inline_{}_comment_{}": "\\2"'.format(k, str(uuid.uuid4())), l, count=1)
-                else:
-                    l = re.sub(inline_patterns[k], '\\1\n".jsonc_inline_{}_comment_{}: \\2"'.format(k, str(uuid.uuid4())), l, count=1)
-        for k in single_line_patterns:
-            if re.search(single_line_patterns[k], l):
-                if map_count > list_count:
-                    l = re.sub(single_line_patterns[k], '".jsonc_{}_comment_{}": "\\1"'.format(k, str(uuid.uuid4())), l, count=1)
-                else:
-                    l = re.sub(single_line_patterns[k], '".jsonc_{}_comment_{}: \\1"'.format(k, str(uuid.uuid4())), l, count=1)
-        for k in block_patterns:
-            if re.search(block_patterns[k], l):
-                if map_count > list_count:
-                    l = re.sub(block_patterns[k], '".jsonc_block_{}_comment_{}": "\\1"'.format(k, str(uuid.uuid4())), l, count=1)
-                else:
-                    l = re.sub(block_patterns[k], '".jsonc_block_{}_comment_{}: \\1"'.format(k, str(uuid.uuid4())), l, count=1)
-        lines[i] = l
-    lines = '\n'.join(lines).split('\n')
-    for i in range(1, len(lines) - 2):
-        l = lines[i]
-        l_next = lines[i + 1]
-        l_strip = l.strip()
-        if not l_strip.endswith(',') and not l_strip.endswith('{') and not l_strip.endswith('['):
-            if l_next.strip().startswith('"'):
-                l = l + ','
-        lines[i] = l
-
-    text = '\n'.join(lines)
-
-    invalid_keys = ['jsonc_key', 'jsonc_with_comments', 'jsonc_parent']
-    for key in invalid_keys:
-        if re.search(f'"{key}"\s*:', text):
-            raise KeyError(f'Key "{key}" in not allowed for a JSONCDict')
-    data = json.loads(text)
+def _pointer_get(root, tokens, path):
+    """
+    Get the value at a JSON Pointer
+    """
+    if not tokens:
+        return root
+    parent = _pointer_parent(root, tokens, path)
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise KeyError(path)
+        return parent[tokens[-1]]
+    return parent[_list_index(tokens[-1], len(parent), path)]
 
-    without_comments = clean_comments(copy.deepcopy(data))
+def _copy_value(value):
+    """
+    Copy a value along with the comments of its dictionaries and lists
+    """
+    root, comments = _pack(value)
+    tables = []
+    for index, table in comments:
+        if type(table) == dict:
+            table = {key: list(entries) for key, entries in table.items()}
+        elif index is None:
+            table = tuple(list(entries) for entries in table)
+        else:
+            table = [entries and list(entries) for entries in table]
+        tables.append((index, table))
+    return _unpack((root, tables))
 
-    without_comments_data, without_comments_dtypes = JSONCDict.fix_types(without_comments)
-    dict_obj = JSONCDict(jsonc_dtypes=without_comments_dtypes, **without_comments_data)
-    dict_obj.jsonc_with_comments = data
+def _patch_add(root, tokens, path, value):
+    """
+    Add a value at a JSON Pointer, returning whether the items after it in a list moved
+    """
+    if not tokens:
+        _replace_root(root, value)
+        return False
+    parent = _pointer_parent(root, tokens, path)
+    if isinstance(parent, dict):
+        parent[tokens[-1]] = value
+        return False
+    index = _list_index(tokens[-1], len(parent), path, end=True)
+    if index == len(parent):
+        parent.append(value)
+        return False
+    parent.insert(index, value)
+    return True
 
-    return dict_obj
+def _patch_remove(root, tokens, path):
+    """
+    Remove the value at a JSON Pointer, returning it and whether the items after it in a list moved
+    """
+    if not tokens:
+        raise ValueError('The root of a document can not be removed')
+    parent = _pointer_parent(root, tokens, path)
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise KeyError(path)
+        return parent.pop(tokens[-1]), False
+    index = _list_index(tokens[-1], len(parent), path)
+    value = parent[index]
+    del parent[index]
+    return value, True
 
-def dumps(data, indent=4, comments=True):
+def _patch_replace(root, tokens, path, value):
     """
-    Write the JSONCDict to a string
+    Replace the value at a JSON Pointer
     """
-    if indent <=0 :
-        err = ValueError('Indent value must be greater or equal to 1')
-        raise err
-    if comments:
-        text = json.dumps(data.jsonc_with_comments, indent=indent)
+    if not tokens:
+        _replace_root(root, value)
+        return
+    parent = _pointer_parent(root, tokens, path)
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise KeyError(path)
+        parent[tokens[-1]] = value
     else:
-        text = json.dumps(data, indent=indent)
-
-    # replace single-line c-style comments that are in a map
-    text = re.sub(r'"\.jsonc_c_comment_[a-z0-9]{8}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{12}"\: "(.*)",?', '//\\1', text)
-    # replace single-line python-style comments that are in a map
-    text = re.sub(r'"\.jsonc_python_comment_[a-z0-9]{8}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{12}"\: "(.*)",?', '#\\1', text)
-    # replace single-line c-style comments that are in a list
-    text = re.sub(r'"\.jsonc_c_comment_[a-z0-9]{8}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{12}\: (.*)",?', '//\\1', text)
-    # replace single-line python-style comments that are in a lit
-    text = re.sub(r'"\.jsonc_python_comment_[a-z0-9]{8}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{12}\: (.*)",?', '#\\1', text)
-
-    # replace inline c-style comments that are in a map
-    text = re.sub(r'\n\s*"\.jsonc_inline_c_comment_[a-z0-9]{8}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{12}"\: "(.*)",?', ' //\\1', text)
-    # replace inline python-style comments that are in a map
-    text = re.sub(r'\n\s*"\.jsonc_inline_python_comment_[a-z0-9]{8}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{12}"\: "(.*)",?', ' #\\1', text)
-    # replace inline c-style comments that are in a list
-    text = re.sub(r'\n\s*"\.jsonc_inline_c_comment_[a-z0-9]{8}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{12}\: (.*)",?', ' //\\1', text)
-    # replace inline python-style comments that are in a list
-    text = re.sub(r'\n\s*"\.jsonc_inline_python_comment_[a-z0-9]{8}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{12}\: (.*)",?', ' #\\1', text)
-
-    # replace block c-style comments that are in a map
-    text = re.sub(r'"\.jsonc_block_c_comment_[a-z0-9]{8}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{12}"\: "(.*)",?', '/*\\1*/', text)
-    # replace block c-style comments that are in a list
-    text = re.sub(r'"\.jsonc_block_c_comment_[a-z0-9]{8}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{12}\: (.*)",?', '/*\\1*/', text)
-
-    # replace newline placeholders
-    text = text.replace('<JSONC_LINUX_NEWLINE>', '\n')
-    text = text.replace('<JSONC_WINDOWS_NEWLINE>', '\r\n')
-
-    lines = text.split('\n')
-    for i in range(1, len(lines) - 2):
-        l = lines[i]
-        l_next = lines[i + 1]
-        match = re.search(r'(.*)((?://|#).*)', l)
-        if match:
-            if l_next.strip().startswith('}') or l_next.strip().startswith(']'):
-                if match.group(1).rstrip().endswith(','):
-                    parts = match.group(1).split(',')
-                    lines[i] = ','.join(parts[:-1]) + parts[-1] + match.group(2)
-
-    text = '\n'.join(lines)
+        parent[_list_index(tokens[-1], len(parent), path)] = value
 
-    return text
+def _replace_root(root, value):
+    """
+    Replace the contents of the node a patch is applied to
+    """
+    if isinstance(root, dict) and isinstance(value, dict):
+        root.clear()
+        root.update(value)
+        root.jsonc_comments = value.jsonc_comments if type(value) == JSONCDict else {}
+    elif type(root) == JSONCList and type(value) == JSONCList:
+        while len(root):
+            del root[-1]
+        for item in list.copy(value):
+            root.append(item)
+        root.jsonc_comments = value.jsonc_comments
+    else:
+        raise ValueError('The root of a document can only be replaced by a value of the same type')
 
-def dump(data, stream, indent=4, comments=True):
+def _apply_patch(root, patch):
     """
-    Write the JSONCDict to a file
+    Apply a JSON Patch to a node, see JSONCDict.apply_patch
     """
-    text = dumps(data, indent=indent, comments=comments)
-    stream.write(text)
+    # each change is an operation with the pointers it touched and whether the items after
+    # them in a list moved as well
+    changes = []
+    try:
+        with root.batch():
+            for operation in patch:
+                op = operation.get('op')
+                path = operation['path']
+                tokens = _pointer(path)
+                if op == 'test':
+                    if _pack(_pointer_get(root, tokens, path))[0] != _pack(operation['value'])[0]:
+                        raise ValueError(f'Test of "{path}" failed')
+                    continue
+                if op == 'add':
+                    touched = [(tokens, _patch_add(root, tokens, path, _copy_value(operation['value'])))]
+                elif op == 'remove':
+                    touched = [(tokens, _patch_remove(root, tokens, path)[1])]
+                elif op == 'replace':
+                    _patch_replace(root, tokens, path, _copy_value(operation['value']))
+                    touched = [(tokens, False)]
+                elif op in ('move', 'copy'):
+                    source = _pointer(operation['from'])
+                    if op == 'copy':
+                        value = _copy_value(_pointer_get(root, source, operation['from']))
+                        touched = []
+                    elif tokens[:len(source)] == source and len(tokens) > len(source):
+                        raise ValueError(f'"{operation["from"]}" can not be moved into itself')
+                    else:
+                        value, moved = _patch_remove(root, source, operation['from'])
+                        touched = [(source, moved)]
+                    touched.append((tokens, _patch_add(root, tokens, path, value)))
+                else:
+                    raise ValueError(f'Unknown patch operation "{op}"')
+                changes.append((operation, touched))
+    finally:
+        # the operations applied before one that failed stay applied, so they are reported as well
+        for path, tokens, callback in list(root._subscribers or ()):
+            operations = [operation for operation, touched in changes
+                          if any(_touches(tokens, changed, moved) for changed, moved in touched)]
+            if operations:
+                callback(operations)
 
-def clean_comments(data):
+def _touches(tokens, changed, moved):
+    """
+    Check if a change at the pointer changed affects the value at the pointer tokens
+    """
+    depth = min(len(tokens), len(changed))
+    if tokens[:depth] == changed[:depth]:
+        return True
+    # adding or removing a list item moves the items after it
+    depth = len(changed) - 1
+    return (moved and len(tokens) > depth and tokens[:depth] == changed[:depth]
+            and _INDEX_TOKEN.fullmatch(tokens[depth]) is not None and int(tokens[depth]) >= int(changed[depth]))
+
+def _same_source(a, b):
+    """
+    Check if two nodes were parsed from the same text without having been changed since
+    """
+    if (type(a) != JSONCDict and type(a) != JSONCList) or type(a) != type(b):
+        return False
+    span_a, span_b = a.jsonc_span, b.jsonc_span
+    if span_a is None or span_b is None or a.jsonc_dirty or b.jsonc_dirty:
+        return False
+    if span_a[1] - span_a[0] != span_b[1] - span_b[0]:
+        return False
+    return a.jsonc_source[span_a[0]:span_a[1]] == b.jsonc_source[span_b[0]:span_b[1]]
+
+def _same(a, b):
+    """
+    Check if two values are equal, telling booleans and numbers apart unlike ==
+    """
+    if a is not b and a != b:
+        return False
+    stack = [(a, b)]
+    while stack:
+        a, b = stack.pop()
+        if a is b or _same_source(a, b):
+            continue
+        if isinstance(a, dict) and isinstance(b, dict):
+            stack.extend((value, dict.__getitem__(b, key)) for key, value in dict.items(a))
+        elif isinstance(a, (list, JSONCList)) and isinstance(b, (list, JSONCList)):
+            stack.extend(zip(list.__iter__(a), list.__iter__(b)))
+        elif type(a) != type(b):
+            return False
+    return True
+
+def diff(old, new):
+    """
+    Get the JSON Patch (RFC 6902) that turns old into new, as a list of operations
+
+    Only the parts that differ are walked when both were parsed from text, the parts whose text is
+    the same are skipped. The values in the patch are the ones in new. Comments are not compared
+    """
+    patch = []
+    stack = [('', old, new)]
+    while stack:
+        path, a, b = stack.pop()
+        if a is b or _same_source(a, b):
+            continue
+        children = []
+        if isinstance(a, dict) and isinstance(b, dict):
+            for key in dict.keys(a):
+                if key not in b:
+                    patch.append({'op': 'remove', 'path': path + '/' + _pointer_token(key)})
+            for key, value in dict.items(b):
+                child = path + '/' + _pointer_token(key)
+                if key in a:
+                    children.append((child, dict.__getitem__(a, key), value))
+                else:
+                    patch.append({'op': 'add', 'path': child, 'value': value})
+        elif isinstance(a, (list, JSONCList)) and isinstance(b, (list, JSONCList)):
+            x = list.copy(a)
+            y = list.copy(b)
+            # items added or removed in one place show up as a run of adds or removes between
+            # the items the lists start and end with
+            start = 0
+            while start < len(x) and start < len(y) and _same(x[start], y[start]):
+                start += 1
+            end = 0
+            while end < len(x) - start and end < len(y) - start and _same(x[-1 - end], y[-1 - end]):
+                end += 1
+            common = min(len(x), len(y)) - start - end
+            for index in range(start, start + common):
+                children.append((f'{path}/{index}', x[index], y[index]))
+            for index in reversed(range(start + common, len(x) - end)):
+                patch.append({'op': 'remove', 'path': f'{path}/{index}'})
+            for index in range(start + common, len(y) - end):
+                patch.append({'op': 'add', 'path': f'{path}/{index}', 'value': y[index]})
+        elif not _same(a, b):
+            patch.append({'op': 'replace', 'path': path, 'value': b})
+        stack.extend(reversed(children))
+    return patch
+
+def _to_node(data, parent, key):
+    """
+    Wrap a plain dict or list in a node, nested containers are converted on first access
+    """
+    if _profiler is not None:
+        _profiler('convert', {'type': type(data).__name__, 'size': len(data)})
     if type(data) == dict:
-        datum = {k:clean_comments(data[k]) for k in data if not k.startswith('.jsonc_')}
-        datum_fixed, datum_dtypes = JSONCDict.fix_types(datum)
-        with_comments = copy.deepcopy(data)
-        data = JSONCDict(jsonc_dtypes=datum_dtypes, **datum_fixed)
-        data.jsonc_with_comments = with_comments
-    elif type(data) == list:
-        temp = []
-        for x in data:
-            if type(x) == str:
-                if x.startswith('.jsonc_'): continue
-            temp.append(clean_comments(x))
-        data = temp
-    return data
+        out = JSONCDict(parent=parent, jsonc_key=key)
+        dict.update(out, data)
+        return out
+    return JSONCList(data=data, parent=parent, key=key)
+
+def handle_block_newlines(text: str) -> str:
+    """
+    Replace newlines inside of block comments
+
+    Deprecated, the parser reads block comments with their newlines directly and no longer
+    calls this
+    """
+    warnings.warn('handle_block_newlines is no longer used by the parser and will be removed', DeprecationWarning, stacklevel=2)
+
+    # build the output from slices so the cost stays linear in the size of the text
+    parts = []
+    pos = 0
+    while True:
+        start = text.find('/*', pos)
+        if start == -1:
+            break
+        start += 2
+        end = text.find('*/', start)
+        if end == -1:
+            end = len(text)
+        parts.append(text[pos:start])
+        parts.append(text[start:end].replace('\r\n', '<JSONC_WINDOWS_NEWLINE>').replace('\n', '<JSONC_LINUX_NEWLINE>'))
+        pos = end
+    parts.append(text[pos:])
+
+    return ''.join(parts)
+
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+
+# parser states
+_EXPECT_VALUE = 0
+_EXPECT_KEY = 1
+_EXPECT_COLON = 2
+_EXPECT_COMMA = 3
+_EXPECT_END = 4
+
+_INVALID_KEYS = ('jsonc_key', 'jsonc_with_comments', 'jsonc_parent')
+
+def _add_comment(container, style, text):
+    """
+    Store a comment in a with-comments container
+    """
+    if style.endswith('block_c'):
+        text = text.replace('\r\n', '<JSONC_WINDOWS_NEWLINE>').replace('\n', '<JSONC_LINUX_NEWLINE>')
+    name = '.jsonc_{}_comment_{}'.format(style, str(uuid.uuid4()))
+    if type(container) == dict:
+        container[name] = text
+    else:
+        container.append('{}: {}'.format(name, text))
+
+def _with_comments(data):
+    """
+    Build a plain tree with the comments of each node stored as `.jsonc_*` entries
+    """
+    if type(data) not in _CONTAINER_TYPES:
+        return data
+    # as in _unpack, containers are added to their parent empty and filled in when they come off
+    # the stack so that deep trees do not run into the recursion limit
+    top = {} if isinstance(data, dict) else []
+    stack = [(data, top)]
+    while stack:
+        data, out = stack.pop()
+        if type(data) == JSONCDict:
+            comments = data._comments
+        elif type(data) == JSONCList:
+            slots = data._comment_slots
+            comments = None
+            if slots:
+                # the last slot holds the comments at the end of the list
+                comments = dict(enumerate(slots[:-1]))
+                comments[None] = slots[-1]
+            data = list.copy(data)
+        else:
+            comments = None
+        entries = dict.items(data) if type(out) == dict else enumerate(data)
+        if not comments:
+            # copy the entries over at once and only revisit the containers among them
+            if type(out) == dict:
+                out.update(entries)
+            else:
+                out.extend(data)
+            for key, value in entries:
+                if type(value) in _CONTAINER_TYPES:
+                    out[key] = {} if isinstance(value, dict) else []
+                    stack.append((value, out[key]))
+            continue
+        for key, value in entries:
+            inline = []
+            for style, text in comments.get(key) or ():
+                if style.startswith('inline_'):
+                    inline.append((style, text))
+                else:
+                    _add_comment(out, style, text)
+            if type(value) in _CONTAINER_TYPES:
+                child = {} if isinstance(value, dict) else []
+                stack.append((value, child))
+                value = child
+            if type(out) == dict:
+                out[key] = value
+            else:
+                out.append(value)
+            for style, text in inline:
+                _add_comment(out, style, text)
+        for style, text in comments.get(None) or ():
+            _add_comment(out, style, text)
+    return top
+
+def _place_comment(container, key, pending, comment, after_key):
+    """
+    Store a comment found in a container being parsed, returning the comments still waiting for
+    the entry they belong to
+
+    Comments with an inline_ style were on the line of the last entry and belong to it. In a
+    dictionary the comments between a key and its value belong to that key, and the others wait
+    for the next key. In a list they are collected by index and moved into the slots once the
+    list is done
+    """
+    if type(container) == JSONCDict:
+        if after_key or comment[0].startswith('inline_'):
+            container.jsonc_comments.setdefault(key, []).append(comment)
+        elif pending is None:
+            pending = [comment]
+        else:
+            pending.append(comment)
+        return pending
+    index = len(container)
+    if comment[0].startswith('inline_'):
+        index -= 1
+    if pending is None:
+        pending = {}
+    pending.setdefault(index, []).append(comment)
+    return pending
+
+def _parse(text, info=None):
+    """
+    Build the JSONCDict tree for a JSONC string in a single pass
+
+    If info is given the number of comments found is stored in it
+    """
+
+    stack = []
+    container = None
+    is_map = False
+    key = None
+    # comments seen in a dictionary before the key they belong to is known
+    pending = None
+    root = None
+    root_comments = None
+    state = _EXPECT_VALUE
+    # whether a value has been added to the current container on the current line, used to
+    # tell inline comments apart from comments that sit on their own line
+    line_has_value = False
+    pos = 0
+    end = len(text)
+    comment_count = 0
+    # where the current container starts and ends followed by where each of its values starts
+    # and ends, kept on the nodes so that unchanged parts of the text can be copied when writing
+    # them back out
+    offsets = None
+    span_type = 'I' if end < 2 ** 32 else 'q'
+
+    while True:
+        ws_end = _WHITESPACE.match(text, pos).end()
+        if ws_end != pos:
+            if line_has_value and text.find('\n', pos, ws_end) != -1:
+                line_has_value = False
+            pos = ws_end
+        if pos == end:
+            break
+        char = text[pos]
+
+        # comments can appear between any two tokens
+        comment = None
+        if char == '#' or text.startswith('//', pos):
+            comment_end = text.find('\n', pos)
+            if comment_end == -1:
+                comment_end = end
+            elif text[comment_end - 1] == '\r':
+                comment_end -= 1
+            style = 'python' if char == '#' else 'c'
+            if line_has_value:
+                style = 'inline_' + style
+            comment = (style, text[pos + (1 if char == '#' else 2):comment_end])
+            pos = comment_end
+        elif text.startswith('/*', pos):
+            comment_end = text.find('*/', pos + 2)
+            if comment_end == -1:
+                raise json.JSONDecodeError('Unterminated block comment', text, pos)
+            # a block comment after a value on the same line stays after it
+            comment = ('inline_block_c' if line_has_value else 'block_c', text[pos + 2:comment_end])
+            pos = comment_end + 2
+        if comment is not None:
+            comment_count += 1
+            if container is None:
+                # comments before or after the root value, such as a license header
+                if root_comments is None:
+                    root_comments = ([], [])
+                root_comments[state == _EXPECT_END].append(comment)
+                continue
+            pending = _place_comment(container, key, pending, comment, state == _EXPECT_COLON or state == _EXPECT_VALUE)
+            continue
+
+        if state == _EXPECT_COMMA:
+            if char == ',':
+                state = _EXPECT_KEY if is_map else _EXPECT_VALUE
+                pos += 1
+                continue
+            if (char == '}' and is_map) or (char == ']' and not is_map):
+                # fall through to the closing logic below
+                pass
+            elif not line_has_value:
+                # tolerate a missing comma when the next entry starts on a new line
+                state = _EXPECT_KEY if is_map else _EXPECT_VALUE
+            else:
+                raise json.JSONDecodeError("Expecting ',' delimiter", text, pos)
+
+        if state == _EXPECT_COLON:
+            if char != ':':
+                raise json.JSONDecodeError("Expecting ':' delimiter", text, pos)
+            state = _EXPECT_VALUE
+            pos += 1
+            continue
+
+        if state == _EXPECT_END:
+            raise json.JSONDecodeError('Extra data', text, pos)
+
+        value_start = pos
+        if char == '}' or char == ']':
+            if container is None or (char == '}') != is_map:
+                raise json.JSONDecodeError('Unexpected closing bracket', text, pos)
+            if is_map and state == _EXPECT_VALUE:
+                raise json.JSONDecodeError('Expecting value', text, pos)
+            if pending is not None:
+                if is_map:
+                    container.jsonc_comments.setdefault(None, []).extend(pending)
+                else:
+                    container._comment_slots = _comment_slots(len(container), pending)
+            pos += 1
+            value = container
+            # duplicate keys leave fewer entries than values, so the offsets can not be used
+            if not is_map or len(offsets) == 2 * len(container) + 2:
+                offsets[1] = pos
+                container.jsonc_source = text
+                container.jsonc_span = array.array(span_type, offsets)
+            value_start = offsets[0]
+            if stack:
+                container, key, pending, offsets = stack.pop()
+                is_map = type(container) == JSONCDict
+            else:
+                container = None
+        elif state == _EXPECT_KEY:
+            if char != '"':
+                raise json.JSONDecodeError('Expecting property name enclosed in double quotes', text, pos)
+            key, pos = scanstring(text, pos + 1)
+            if key in _INVALID_KEYS:
+                raise KeyError(f'Key "{key}" in not allowed for a JSONCDict')
+            if pending is not None:
+                container.jsonc_comments.setdefault(key, []).extend(pending)
+                pending = None
+            state = _EXPECT_COLON
+            continue
+        elif char == '{' or char == '[':
+            if container is None:
+                node_key = None
+            elif is_map:
+                node_key = key
+            else:
+                node_key = len(container)
+            if char == '{':
+                node = JSONCDict(parent=container, jsonc_key=node_key)
+                state = _EXPECT_KEY
+            else:
+                node = JSONCList(parent=container, key=node_key)
+                state = _EXPECT_VALUE
+            if container is not None:
+                stack.append((container, key, pending, offsets))
+            container = node
+            is_map = char == '{'
+            offsets = [pos, 0]
+            pending = None
+            line_has_value = False
+            pos += 1
+            continue
+        elif char == '"':
+            value, pos = scanstring(text, pos + 1)
+        else:
+            match = NUMBER_RE.match(text, pos)
+            if match is not None:
+                integer, frac, exp = match.groups()
+                if frac or exp:
+                    value = float(integer + (frac or '') + (exp or ''))
+                else:
+                    value = int(integer)
+                pos = match.end()
+            elif text.startswith('true', pos):
+                value = True
+                pos += 4
+            elif text.startswith('false', pos):
+                value = False
+                pos += 5
+            elif text.startswith('null', pos):
+                value = None
+                pos += 4
+            elif text.startswith('NaN', pos):
+                value = float('nan')
+                pos += 3
+            elif text.startswith('Infinity', pos):
+                value = float('inf')
+                pos += 8
+            elif text.startswith('-Infinity', pos):
+                value = float('-inf')
+                pos += 9
+            else:
+                raise json.JSONDecodeError('Expecting value', text, pos)
+
+        if container is None:
+            root = value
+            state = _EXPECT_END
+            line_has_value = True
+            continue
+        if is_map:
+            dict.__setitem__(container, key, value)
+        else:
+            list.append(container, value)
+        offsets.append(value_start)
+        offsets.append(pos)
+        state = _EXPECT_COMMA
+        line_has_value = True
+
+    if state != _EXPECT_END:
+        raise json.JSONDecodeError('Expecting value', text, pos)
+    if info is not None:
+        info['comments'] = comment_count
+    if root_comments is not None and (type(root) == JSONCDict or type(root) == JSONCList):
+        root._root_comments = root_comments
+    return root
+
+def set_profiler(callback):
+    """
+    Set a callback that is called with (phase, info) as jsonc works, None turns profiling off
+
+    The phases are 'read', 'parse', 'encode' and 'write', whose info holds the seconds taken, the
+    size of the data and, while tracemalloc is tracing, the bytes allocated. Nodes built from plain
+    containers on first access are reported as 'convert' and marking ancestors dirty after a change
+    as 'mark_dirty' with the number of nodes marked. Returns the previous callback
+    """
+    global _profiler
+    previous = _profiler
+    _profiler = callback
+    return previous
+
+class Stats(object):
+    """
+    Profiler callback that adds up the calls and info values of each phase
+    """
+
+    def __init__(self):
+        self.phases = {}
+
+    def __call__(self, phase, info):
+        totals = self.phases.get(phase)
+        if totals is None:
+            totals = self.phases[phase] = {'calls': 0}
+        totals['calls'] += 1
+        for name, value in info.items():
+            if type(value) == int or type(value) == float:
+                totals[name] = totals.get(name, 0) + value
+
+    def __repr__(self):
+        return 'Stats(' + repr(self.phases) + ')'
+
+@contextlib.contextmanager
+def profile():
+    """
+    Collect the Stats of everything done inside of the block
+    """
+    stats = Stats()
+    previous = set_profiler(stats)
+    try:
+        yield stats
+    finally:
+        set_profiler(previous)
+
+def _run_phase(profiler, phase, info, func, *args):
+    """
+    Run one phase of loading or dumping and report it to the profiler
+    """
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    out = func(*args)
+    info['seconds'] = time.perf_counter() - start
+    if tracing:
+        info['allocated'] = tracemalloc.get_traced_memory()[0] - before
+    profiler(phase, info)
+    return out
+
+def load(stream, preserve_comments=True):
+    """
+    Initialize a JSONCDict from a file, see loads for preserve_comments
+    """
+    profiler = _profiler
+    if profiler is None:
+        data = stream.read()
+    else:
+        start = time.perf_counter()
+        data = stream.read()
+        profiler('read', {'seconds': time.perf_counter() - start, 'size': len(data)})
+    return loads(data, preserve_comments)
+
+def load_path(path, mmap=True, preserve_comments=True):
+    """
+    Initialize a JSONCDict from a file path
+
+    With mmap set the file is memory mapped and decoded a chunk at a time instead of being read
+    into a string first. See loads for preserve_comments
+    """
+    if not mmap or not preserve_comments:
+        with open(path, encoding='utf-8') as stream:
+            return load(stream, preserve_comments)
+    with open(path, 'rb') as stream:
+        try:
+            mapped = mmap_module.mmap(stream.fileno(), 0, access=mmap_module.ACCESS_READ)
+        except ValueError:
+            # empty files can not be mapped
+            return loads(stream.read())
+    with mapped:
+        profiler = _profiler
+        if profiler is None:
+            return _parse_buffer(mapped)
+        return _run_phase(profiler, 'parse', {'size': len(mapped)}, _parse_buffer, mapped)
+
+class _LoadCache(object):
+    """
+    Least recently used cache of parsed files, keyed on their path, size and modification time
+    """
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # path -> (size, mtime, tree)
+        self.entries = collections.OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def load(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return _view(entry[2])
+            self.misses += 1
+        tree = _freeze(load_path(path, mmap=False), copy=False)
+        with self.lock:
+            self.remove(path)
+            if stat.st_size <= self.max_bytes and self.max_entries > 0:
+                self.entries[path] = (stat.st_size, stat.st_mtime_ns, tree)
+                self.bytes += stat.st_size
+                self.evict()
+        return _view(tree)
+
+    def remove(self, path):
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            self.bytes -= entry[0]
+
+    def evict(self):
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            self.bytes -= self.entries.popitem(last=False)[1][0]
+
+def _frozen_node(value, copy):
+    """
+    Get the node that takes the place of value in a frozen tree, before it is sealed
+    """
+    if type(value) == dict:
+        out = JSONCDict()
+        dict.update(out, value)
+        return out
+    if type(value) == list:
+        return JSONCList(data=list(value) if copy else value)
+    if not copy:
+        return value
+    out = _copy_shared(value, None, None)
+    if value.jsonc_dirty:
+        # the source text only describes the node while it is unchanged
+        out.jsonc_source = None
+        out.jsonc_span = None
+    return out
+
+def _freeze(tree, copy=True):
+    """
+    Turn a tree into frozen nodes, keeping the parts that are frozen already. With copy set the
+    nodes of the tree are copied, otherwise they are frozen themselves
+    """
+    if type(tree) not in _CONTAINER_TYPES or getattr(tree, 'jsonc_parent', None) is _SHARED:
+        return tree
+    top = _frozen_node(tree, copy)
+    # the nodes in the order they are reached, so each one comes before its children
+    nodes = [top]
+    stack = [top]
+    while stack:
+        node = stack.pop()
+        is_map = type(node) == JSONCDict
+        for key, value in list(dict.items(node)) if is_map else enumerate(list.copy(node)):
+            if type(value) not in _CONTAINER_TYPES or getattr(value, 'jsonc_parent', None) is _SHARED:
+                continue
+            child = _frozen_node(value, copy)
+            if is_map:
+                dict.__setitem__(node, key, child)
+            else:
+                list.__setitem__(node, key, child)
+            nodes.append(child)
+            stack.append(child)
+    # the hashes of the children are needed first, so the nodes are sealed bottom up
+    for node in reversed(nodes):
+        _seal(node)
+    return top
+
+def _seal(node):
+    """
+    Make a node frozen once its children are
+    """
+    node.jsonc_parent = _SHARED
+    node.jsonc_key = None
+    # the comments are turned into tuples, so that the snapshot can not be changed through them
+    if node._root_comments is not None:
+        node._root_comments = (tuple(node._root_comments[0]), tuple(node._root_comments[1]))
+    if type(node) == JSONCDict:
+        if node._comments:
+            node._comments = {key: tuple(entries) for key, entries in node._comments.items()}
+        node._hash = hash(frozenset(dict.items(node)))
+    else:
+        if node._comment_slots is not None:
+            node._comment_slots = tuple(None if slot is None else tuple(slot) for slot in node._comment_slots)
+        node._hash = hash(tuple(list.__iter__(node)))
+
+_MERGE_STRATEGIES = {
+    'dict': ('merge', 'replace'),
+    'list': ('replace', 'append', 'prepend', 'unique'),
+}
+
+def _merge_strategy(strategy):
+    """
+    Check a merge strategy, returning the dict and list strategies and the ones set for paths
+    """
+    strategy = dict(strategy or {})
+    dicts = strategy.pop('dict', 'merge')
+    lists = strategy.pop('list', 'replace')
+    if dicts not in _MERGE_STRATEGIES['dict'] or lists not in _MERGE_STRATEGIES['list']:
+        raise ValueError(f'Unknown merge strategy "{dicts}" for dictionaries or "{lists}" for lists')
+    for path, name in strategy.items():
+        _pointer(path)
+        if name not in _MERGE_STRATEGIES['dict'] and name not in _MERGE_STRATEGIES['list']:
+            raise ValueError(f'Unknown merge strategy "{name}" for "{path}"')
+    return dicts, lists, strategy
+
+def _merge_sources(path, values, strategy):
+    """
+    Get the (layer, value) pairs the value at a path is merged from, the last one of values wins
+    """
+    dicts, lists, paths = strategy
+    winner = values[-1][1]
+    if isinstance(winner, dict):
+        kind, name = 'dict', paths.get(path, dicts)
+    elif type(winner) == JSONCList:
+        kind, name = 'list', paths.get(path, lists)
+    else:
+        return values[-1:], None
+    if name not in _MERGE_STRATEGIES[kind]:
+        raise ValueError(f'Merge strategy "{name}" for "{path}" can not be used for a {kind}')
+    if name == 'replace':
+        return values[-1:], name
+    # a layer that sets a value of another type replaces the ones below it
+    start = len(values) - 1
+    while start > 0 and type(values[start - 1][1]) == type(winner):
+        start -= 1
+    return values[start:], name
+
+def _merge_items(sources, name):
+    """
+    Get the (layer, list, index) of each item of the lists merged with a list strategy
+    """
+    if name == 'prepend':
+        sources = sources[::-1]
+    items = [(layer, value, index) for layer, value in sources for index in range(len(value))]
+    if name == 'unique':
+        seen = set()
+        unique = []
+        for item in items:
+            value = list.__getitem__(item[1], item[2])
+            # the type is part of the key so that true and 1 are kept apart
+            if (type(value), value) not in seen:
+                seen.add((type(value), value))
+                unique.append(item)
+        items = unique
+    return items
+
+def _merge(layers, strategy, memo, previous):
+    """
+    Merge frozen layers into frozen nodes, see merge
+
+    Each merged container is kept in memo under its path and the identities of the nodes it was
+    merged from, and taken from previous instead of being merged again if it is there
+    """
+    # the new nodes in the order they are made, each one before its children
+    created = []
+    out = [None]
+    stack = [('', list(enumerate(layers)), out, 0)]
+    while stack:
+        path, values, holder, slot = stack.pop()
+        sources, name = _merge_sources(path, values, strategy)
+        if len(sources) == 1:
+            value = sources[0][1]
+        else:
+            key = (path, tuple(id(source) for layer, source in sources))
+            entry = previous.get(key) or memo.get(key)
+            if entry is None:
+                value = _merge_node(path, sources, name, stack)
+                created.append(value)
+                entry = (value, sources)
+            memo[key] = entry
+            value = entry[0]
+        if type(holder) == JSONCDict:
+            dict.__setitem__(holder, slot, value)
+        elif type(holder) == JSONCList:
+            list.__setitem__(holder, slot, value)
+        else:
+            holder[slot] = value
+    for node in reversed(created):
+        _seal(node)
+    return out[0]
+
+def _merge_node(path, sources, name, stack):
+    """
+    Make the node merged from several containers, adding the values below it that have to be
+    merged in turn to the stack
+    """
+    if name == 'merge':
+        out = JSONCDict()
+        comments = {}
+        for layer, source in sources:
+            for key, entries in (source._comments or {}).items():
+                merged = comments.setdefault(key, [])
+                merged.extend(entry for entry in entries if entry not in merged)
+        children = {}
+        for layer, source in sources:
+            for key, value in dict.items(source):
+                if key not in children:
+                    children[key] = []
+                    dict.__setitem__(out, key, None)
+                children[key].append((layer, value))
+        for key in reversed(list(children)):
+            values = children[key]
+            # a value set by one layer is taken as it is
+            if len(values) == 1:
+                dict.__setitem__(out, key, values[0][1])
+            else:
+                stack.append((path + '/' + _pointer_token(key), values, out, key))
+        out._comments = comments or None
+        return out
+    items = _merge_items(sources, name)
+    out = JSONCList(data=[list.__getitem__(value, index) for layer, value, index in items])
+    if any(value._comment_slots for layer, value in sources):
+        slots = [value._comment_slots and value._comment_slots[index] for layer, value, index in items]
+        end = []
+        for layer, value in sources:
+            end.extend(entry for entry in (value._comment_slots or [None])[-1] or () if entry not in end)
+        out._comment_slots = slots + [end or None]
+    return out
+
+def merge(*docs, strategy=None):
+    """
+    Merge documents into a frozen JSONCDict, each document overriding the ones before it
+
+    The strategy maps 'dict' to 'merge' (the default) or 'replace', and 'list' to 'replace' (the
+    default), 'append', 'prepend' or 'unique'. Other keys are JSON Pointers such as `/servers`
+    that set the strategy for the value at that path. Values set by a single document are shared
+    with it instead of being copied, and the comments of every document are kept. See Layers to
+    find which document a value came from and to merge again after one of them changes
+    """
+    return Layers(*docs, strategy=strategy).merged
+
+class Layers(object):
+    """
+    A stack of documents merged into one, see merge
+
+    Merging again after a layer is replaced only merges the paths whose values changed, when the
+    new layer shares its unchanged parts with the old one, as a thawed, changed and frozen copy of
+    it or one updated with apply_patch does
+    """
+
+    def __init__(self, *docs, strategy=None):
+        self._strategy = _merge_strategy(strategy)
+        self._layers = [_freeze(doc) for doc in docs]
+        self._merged = _MISSING
+        self._memo = {}
+
+    def __len__(self):
+        return len(self._layers)
+
+    def __getitem__(self, index):
+        return self._layers[index]
+
+    def __setitem__(self, index, doc):
+        self._layers[index] = _freeze(doc)
+        self._merged = _MISSING
+
+    def append(self, doc):
+        """
+        Add a layer on top of the others
+        """
+        self._layers.append(_freeze(doc))
+        self._merged = _MISSING
+
+    @property
+    def merged(self):
+        """
+        The frozen result of merging the layers
+        """
+        if self._merged is _MISSING:
+            if not self._layers:
+                raise ValueError('There are no layers to merge')
+            memo = {}
+            self._merged = _merge(self._layers, self._strategy, memo, self._memo)
+            self._memo = memo
+        return self._merged
+
+    def origin(self, path):
+        """
+        Get the indexes of the layers the value at a JSON Pointer came from, a value that was
+        merged from several layers has all of them
+        """
+        values = list(enumerate(self._layers))
+        current = ''
+        for token in _pointer(path):
+            sources, name = _merge_sources(current, values, self._strategy)
+            winner = sources[-1][1]
+            if isinstance(winner, dict):
+                values = [(layer, dict.__getitem__(source, token)) for layer, source in sources if token in source]
+            elif type(winner) == JSONCList:
+                items = [(layer, source, index) for layer, source in sources[-1:]
+                         for index in range(len(source))]
+                if len(sources) > 1:
+                    items = _merge_items(sources, name)
+                index = _list_index(token, len(items), path)
+                layer, source, index = items[index]
+                values = [(layer, list.__getitem__(source, index))]
+            else:
+                values = []
+            if not values:
+                raise KeyError(path)
+            current += '/' + _pointer_token(token)
+        return tuple(layer for layer, value in _merge_sources(current, values, self._strategy)[0])
+
+def _view(tree):
+    """
+    Get a copy of a shared tree for one caller
+    """
+    if type(tree) == JSONCDict or type(tree) == JSONCList:
+        return _copy_shared(tree, None, None)
+    return tree
+
+_load_cache = _LoadCache()
+
+def load_cached(path):
+    """
+    Initialize a JSONCDict from a file path, reusing the parsed file while it is unchanged
+
+    Each call returns its own copy, which is made lazily as its nodes are read
+    """
+    return _load_cache.load(path)
+
+def set_cache_limits(max_entries=None, max_bytes=None):
+    """
+    Set the number of files and the total file size kept by load_cached
+    """
+    with _load_cache.lock:
+        if max_entries is not None:
+            _load_cache.max_entries = max_entries
+        if max_bytes is not None:
+            _load_cache.max_bytes = max_bytes
+        _load_cache.evict()
+
+def cache_info():
+    """
+    Get the hit and miss counts and the size of the load_cached cache
+    """
+    with _load_cache.lock:
+        return {
+            'hits': _load_cache.hits,
+            'misses': _load_cache.misses,
+            'entries': len(_load_cache.entries),
+            'bytes': _load_cache.bytes,
+            'max_entries': _load_cache.max_entries,
+            'max_bytes': _load_cache.max_bytes,
+        }
+
+def cache_clear():
+    """
+    Empty the load_cached cache and reset its counts
+    """
+    with _load_cache.lock:
+        _load_cache.entries.clear()
+        _load_cache.bytes = 0
+        _load_cache.hits = 0
+        _load_cache.misses = 0
+
+def loads(text, preserve_comments=True):
+    """
+    Initialize a JSONCDict from a string, or from UTF-8 encoded bytes
+
+    With preserve_comments unset the comments are dropped and plain dicts and lists are returned,
+    which is much faster when the comments and round trips are not needed
+    """
+
+    profiler = _profiler
+    if not preserve_comments:
+        if profiler is None:
+            return _loads_plain(text)
+        return _run_phase(profiler, 'parse', {'size': len(text)}, _loads_plain, text)
+    if isinstance(text, (bytes, bytearray, memoryview)):
+        if profiler is None:
+            return _parse_buffer(text)
+        return _run_phase(profiler, 'parse', {'size': memoryview(text).nbytes}, _parse_buffer, text)
+    if profiler is None:
+        return _parse_text(text)
+    info = {'size': len(text)}
+    return _run_phase(profiler, 'parse', info, _parse_text, text, info)
+
+# each match is a run of text without comments, where strings are matched whole so that comment
+# markers inside of them are kept, followed by the comment that ends it, which is removed
+_STRIP_COMMENTS = re.compile(r"""((?:[^"/#]+|"[^"\\]*(?:\\.[^"\\]*)*"|/(?![/*]))*)(//[^\n]*|#[^\n]*|/\*[\s\S]*?\*/)?""")
+# the same for runs of text followed by a trailing comma
+_STRIP_COMMAS = re.compile(r"""((?:[^",]+|"[^"\\]*(?:\\.[^"\\]*)*"|,(?!\s*[\]}]))*),?""")
+_TRAILING_COMMA = re.compile(r',\s*[\]}]')
+# a comma without a value before it, which is an error even when it looks like a trailing comma
+_EMPTY_ENTRY = re.compile(r'[\[{,]\s*,')
+
+def _strip_comment(match):
+    """
+    Replace a comment matched by _STRIP_COMMENTS with whitespace, so that the values on either
+    side of it are not joined and errors are reported on the same line
+    """
+    comment = match.group(2)
+    if comment is None:
+        return match.group(1)
+    return match.group(1) + ('\n' * comment.count('\n') or ' ')
+
+def strip(text):
+    """
+    Remove the comments and trailing commas from a JSONC string
+    """
+    if '/' in text or '#' in text:
+        text = _STRIP_COMMENTS.sub(_strip_comment, text)
+    if _TRAILING_COMMA.search(text) is not None:
+        text = _STRIP_COMMAS.sub(r'\1', text)
+    return text
+
+def _loads_plain(text):
+    """
+    Parse a JSONC string into plain dicts and lists without its comments
+    """
+    if isinstance(text, (bytes, bytearray, memoryview)):
+        text = bytes(text)
+        text = text.decode(json.detect_encoding(text))
+    stripped = text
+    if '/' in stripped or '#' in stripped:
+        stripped = _STRIP_COMMENTS.sub(_strip_comment, stripped)
+    if _EMPTY_ENTRY.search(stripped) is None:
+        if _TRAILING_COMMA.search(stripped) is not None:
+            stripped = _STRIP_COMMAS.sub(r'\1', stripped)
+        try:
+            return json.loads(stripped)
+        except (json.JSONDecodeError, RecursionError):
+            pass
+    # the parser accepts more than comments and trailing commas, such as entries on separate
+    # lines without a comma, and raises the same errors as loads otherwise. Unlike json.loads it
+    # has no limit on the nesting depth
+    return _pack(_parse(text))[0]
+
+class _Backend(object):
+    """
+    JSON library used to decode documents that turn out to be plain JSON
+    """
+
+    def __init__(self, name, loads=None):
+        self.name = name
+        # None when the built-in parser handles every document
+        self.loads = loads
+
+def _import_backend(name):
+    """
+    Get the backend with the given name, raising ImportError if its library is not installed
+    """
+    if name == 'json':
+        return _Backend('json')
+    if name == 'orjson':
+        import orjson
+        return _Backend(name, orjson.loads)
+    if name == 'ujson':
+        import ujson
+        return _Backend(name, lambda data: ujson.loads(_str_or_bytes(data)))
+    if name == 'simdjson':
+        import simdjson
+        return _Backend(name, lambda data: simdjson.loads(_str_or_bytes(data)))
+    raise ValueError(f'Unknown backend "{name}", expected one of {", ".join(BACKENDS)}')
+
+def _str_or_bytes(data):
+    """
+    Copy bytes-like objects other than bytes for the libraries that only read str and bytes
+    """
+    if type(data) == str or type(data) == bytes:
+        return data
+    return bytes(data)
+
+BACKENDS = ('json', 'orjson', 'ujson', 'simdjson')
+
+_backend = _import_backend('json')
+
+def set_backend(name):
+    """
+    Choose the JSON library that decodes documents without comments, returns the previous name
+
+    The default 'json' backend parses every document with the built-in parser, which is based on
+    the json module. The others try their library first and fall back to the built-in parser for
+    anything it does not accept, so the results are the same
+    """
+    global _backend
+    previous = _backend.name
+    _backend = _import_backend(name)
+    return previous
+
+def get_backend():
+    """
+    Get the name of the backend in use
+    """
+    return _backend.name
+
+def available_backends():
+    """
+    Get the names of the backends whose library is installed
+    """
+    out = []
+    for name in BACKENDS:
+        try:
+            _import_backend(name)
+        except ImportError:
+            continue
+        out.append(name)
+    return out
+
+# documents the backends may read differently from the built-in parser: keys that are not allowed
+# and integers too large for 64 bits, which some libraries turn into floats
+_BACKEND_UNSAFE_TEXT = re.compile(r'jsonc_|\d{19}')
+_BACKEND_UNSAFE_BYTES = re.compile(rb'jsonc_|\d{19}')
+_ESCAPE_TEXT = re.compile(r'\\u')
+_ESCAPE_BYTES = re.compile(rb'\\u')
+# returned when the backend did not accept the document
+_NOT_JSON = object()
+
+def _backend_parse(data, unsafe, escape):
+    """
+    Decode a plain JSON document with the backend, nested containers are converted on first access
+    """
+    if unsafe.search(data) is not None:
+        return _NOT_JSON
+    try:
+        out = _backend.loads(data if type(data) == str or type(data) == bytes else memoryview(data))
+    except Exception:
+        return _NOT_JSON
+    if type(out) != dict and type(out) != list:
+        return out
+    # keys that are not allowed can still be hidden behind escapes
+    if escape.search(data) is not None and _has_invalid_key(out):
+        return _NOT_JSON
+    node = _to_node(out, None, None)
+    if type(data) == str or type(data) == bytes:
+        # the backend gives no spans, the text is kept so that incremental dumps can parse it again
+        # for them, see _respan
+        node.jsonc_source = data
+        node.jsonc_edits = _RESPAN
+    return node
+
+# jsonc_edits of the root of a tree decoded by a backend, whose jsonc_source has no spans yet
+_RESPAN = object()
+
+def _respan(node):
+    """
+    Get a copy of a tree decoded by a backend with the spans of its source, by parsing the source
+    again and making the changes made to the tree since
+    """
+    source = node.jsonc_source
+    if type(source) == bytes:
+        source = source.decode(json.detect_encoding(source))
+    out = _parse(source)
+    _apply_patch(out, diff(out, node))
+    # comments are not part of the patch, so the ones added since are copied over
+    stack = [(node, out)]
+    while stack:
+        a, b = stack.pop()
+        if type(a) == JSONCDict:
+            comments = a._comments or {}
+            if comments != (b._comments or {}):
+                b.jsonc_comments = {key: list(entries) for key, entries in comments.items()}
+            entries = dict.items(a)
+        else:
+            comments = a.jsonc_comments
+            if comments != b.jsonc_comments:
+                b.jsonc_comments = {key: list(entries) for key, entries in comments.items()}
+            entries = enumerate(list.__iter__(a))
+        for key, value in entries:
+            if type(value) == JSONCDict or type(value) == JSONCList:
+                stack.append((value, b[key]))
+    if node._root_comments is not None:
+        out._root_comments = (list(node._root_comments[0]), list(node._root_comments[1]))
+    return out
+
+def _has_invalid_key(data):
+    """
+    Check if any dictionary in a plain tree has a key that is not allowed in a JSONCDict
+    """
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if type(node) == dict:
+            if not _INVALID_KEY_SET.isdisjoint(node):
+                return True
+            node = node.values()
+        for value in node:
+            if type(value) == dict or type(value) == list:
+                stack.append(value)
+    return False
+
+_INVALID_KEY_SET = frozenset(_INVALID_KEYS)
+
+def _check_keys(data):
+    """
+    Raise the KeyError of JSONCDict.__setitem__ if data has a key that is not allowed
+    """
+    if not _INVALID_KEY_SET.isdisjoint(data):
+        key = next(key for key in data if key in _INVALID_KEY_SET)
+        raise KeyError(f'Key "{key}" in not allowed for a JSONCDict')
+
+def _parse_text(text, info=None):
+    """
+    Build the JSONCDict tree for a string, with the backend if it is plain JSON
+    """
+    if _backend.loads is not None:
+        out = _backend_parse(text, _BACKEND_UNSAFE_TEXT, _ESCAPE_TEXT)
+        if out is not _NOT_JSON:
+            return out
+    return _parse(text, info)
+
+def _parse_buffer(buffer):
+    """
+    Build the JSONCDict tree for a bytes-like object, with the backend if it is plain JSON
+    """
+    if _backend.loads is not None:
+        out = _backend_parse(buffer, _BACKEND_UNSAFE_BYTES, _ESCAPE_BYTES)
+        if out is not _NOT_JSON:
+            return out
+    out = _load_buffer(buffer)
+    if type(buffer) == bytes and (type(out) == JSONCDict or type(out) == JSONCList):
+        # the chunks give no spans either, see _backend_parse
+        out.jsonc_source = buffer
+        out.jsonc_edits = _RESPAN
+    return out
+
+class _BufferReader(object):
+    """
+    Read chunks of a bytes-like object without copying the whole of it
+    """
+
+    def __init__(self, buffer):
+        self.view = memoryview(buffer)
+        self.pos = 0
+
+    def read(self, size):
+        start = self.pos
+        self.pos = min(start + size, len(self.view))
+        return self.view[start:self.pos].tobytes()
+
+def _load_buffer(buffer):
+    """
+    Build the JSONCDict tree for a bytes-like object a chunk at a time
+    """
+    reader = _BufferReader(buffer)
+    try:
+        return _load_chunks(reader, _CHUNK_SIZE)
+    finally:
+        reader.view.release()
+
+def _load_chunks(stream, chunk_size):
+    """
+    Build the JSONCDict tree for a stream, reading it chunk_size at a time
+    """
+    events = _iter_events(_iter_tokens(stream, chunk_size))
+    # comments before or after the root value, as in _parse
+    root_comments = ([], [])
+    for _, event, value in events:
+        if event == 'comment':
+            root_comments[0].append(value)
+        elif event == 'start_map' or event == 'start_array':
+            root = _build(event, events)
+            break
+        else:
+            root = value
+            break
+    # reading the rest of the events also makes sure nothing else follows the root value
+    root_comments[1].extend(value for _, event, value in events)
+    if (root_comments[0] or root_comments[1]) and (type(root) == JSONCDict or type(root) == JSONCList):
+        root._root_comments = root_comments
+    return root
+
+_COMMENT_FORMATS = {
+    'c': '//{}',
+    'python': '#{}',
+    'block_c': '/*{}*/',
+    'inline_c': '//{}',
+    'inline_python': '#{}',
+    'inline_block_c': '/*{}*/'
+}
+
+# number of chunks dump collects before writing them to the stream
+_WRITE_BATCH = 4096
+
+def _encode_float(value):
+    """
+    Encode a float the same way json does
+    """
+    if value != value:
+        return 'NaN'
+    if value == float('inf'):
+        return 'Infinity'
+    if value == float('-inf'):
+        return '-Infinity'
+    return float.__repr__(value)
+
+def _encode_key(key):
+    """
+    Encode a dictionary key, converting the same non-string keys json does
+    """
+    if isinstance(key, str):
+        return encode_basestring_ascii(key)
+    if key is True:
+        return '"true"'
+    if key is False:
+        return '"false"'
+    if key is None:
+        return '"null"'
+    if isinstance(key, int):
+        return '"' + int.__repr__(key) + '"'
+    if isinstance(key, float):
+        return '"' + _encode_float(key) + '"'
+    raise TypeError(f'keys must be str, int, float, bool or None, not {key.__class__.__name__}')
+
+def _encode_value(value):
+    """
+    Encode a scalar value
+    """
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)
+    if value is None:
+        return 'null'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if isinstance(value, int):
+        return int.__repr__(value)
+    if isinstance(value, float):
+        return _encode_float(value)
+    raise TypeError(f'Object of type {value.__class__.__name__} is not JSON serializable')
+
+def _entries(data, comments):
+    """
+    Get the (key, value) pairs, comments and brackets of a container
+    """
+    if isinstance(data, dict):
+        table = data._comments if comments and type(data) == JSONCDict else None
+        return dict.items(data), table, True
+    if type(data) == JSONCList:
+        table = data._comment_slots if comments else None
+        return enumerate(list.__iter__(data)), table, False
+    return enumerate(data), None, False
+
+def _iterencode(data, indent, comments, padding='\n', source=False):
+    """
+    Encode data as JSONC, yielding chunks of text as the tree is walked
+
+    padding is the newline and indentation of the line data starts on. With source set, nodes that
+    were parsed from text are not encoded but yielded as (node, padding) for _iterencode_source
+    """
+    if not isinstance(data, (dict, list, tuple, JSONCList)):
+        yield _encode_value(data)
+        return
+
+    # each frame holds the iterator over a container's entries, its comment table, whether it is
+    # a dictionary, its indentation, the number of entries written so far and the inline comments
+    # of the last entry, which have to wait until we know if a comma goes before them
+    items, table, is_map = _entries(data, comments)
+    stack = [[iter(items), table, is_map, padding + ' ' * indent, 0, None]]
+    yield '{' if is_map else '['
+
+    while stack:
+        frame = stack[-1]
+        items, table, is_map, padding, count, inline = frame
+        entry = next(items, None)
+        if entry is None:
+            if inline:
+                yield from _inline_comments(inline, padding)
+            trailing = None
+            if table:
+                trailing = table.get(None) if is_map else table[-1]
+            if trailing:
+                for style, text in trailing:
+                    yield padding + _COMMENT_FORMATS[style].format(text)
+            closing = '}' if is_map else ']'
+            if count == 0 and not trailing:
+                yield closing
+            else:
+                yield padding[:-indent] + closing
+            stack.pop()
+            continue
+
+        key, value = entry
+        if count > 0:
+            yield ','
+            if inline:
+                yield from _inline_comments(inline, padding)
+        frame[4] = count + 1
+        inline = None
+        if table:
+            entry_comments = table.get(key) if is_map else table[key]
+            if entry_comments:
+                for style, text in entry_comments:
+                    if style.startswith('inline_'):
+                        if inline is None:
+                            inline = []
+                        inline.append((style, text))
+                    else:
+                        yield padding + _COMMENT_FORMATS[style].format(text)
+        frame[5] = inline
+        if is_map:
+            yield padding + _encode_key(key) + ': '
+        else:
+            yield padding
+        if source and (type(value) == JSONCDict or type(value) == JSONCList) and value.jsonc_span is not None:
+            yield value, padding
+        elif isinstance(value, (dict, list, tuple, JSONCList)):
+            items, table, is_map = _entries(value, comments)
+            stack.append([iter(items), table, is_map, padding + ' ' * indent, 0, None])
+            yield '{' if is_map else '['
+        else:
+            yield _encode_value(value)
+
+def _iterencode_source(data, indent):
+    """
+    Encode data as JSONC, copying the source text of the parts that have not changed
+    """
+    # each entry is an iterator over pieces of the output, which are either text or a
+    # (value, padding) pair for a value that has to be written in turn
+    stack = [iter([(data, '\n')])]
+    while stack:
+        piece = next(stack[-1], None)
+        if piece is None:
+            stack.pop()
+        elif type(piece) == str:
+            yield piece
+        else:
+            value, padding = piece
+            span = value.jsonc_span if type(value) == JSONCDict or type(value) == JSONCList else None
+            if span is None:
+                stack.append(_iterencode(value, indent, True, padding, True))
+            elif not value.jsonc_dirty:
+                yield value.jsonc_source[span[0]:span[1]]
+            else:
+                stack.append(_splice(value))
+
+def _splice(node):
+    """
+    Yield the source text of a node that has changed, with the changed values left as
+    (value, padding) pieces
+    """
+    text = node.jsonc_source
+    offsets = node.jsonc_span
+    edits = node.jsonc_edits or ()
+    if type(node) == JSONCDict:
+        entries = dict.items(node)
+    else:
+        entries = enumerate(list.__iter__(node))
+    pos = offsets[0]
+    for index, (key, value) in enumerate(entries, 1):
+        if key in edits or ((type(value) == JSONCDict or type(value) == JSONCList)
+                            and (value.jsonc_dirty or value.jsonc_span is None)):
+            value_start = offsets[2 * index]
+            yield text[pos:value_start]
+            # values written out again are indented to match the line they start on
+            line_start = text.rfind('\n', 0, value_start) + 1
+            yield value, '\n' + text[line_start:_INDENT.match(text, line_start).end()]
+            pos = offsets[2 * index + 1]
+    yield text[pos:offsets[1]]
+
+_INDENT = re.compile(r'[ \t]*')
+
+def _inline_comments(inline, padding):
+    """
+    Write the inline comments of an entry, only the first one can stay on the entry's line
+    """
+    for index, (style, text) in enumerate(inline):
+        yield (' ' if index == 0 else padding) + _COMMENT_FORMATS[style].format(text)
+
+def _check_indent(indent):
+    """
+    Make sure the indent can be used
+    """
+    if indent <=0 :
+        err = ValueError('Indent value must be greater or equal to 1')
+        raise err
+
+def _encoder(data, indent, comments, incremental):
+    """
+    Get the chunks of text to write for data
+    """
+    if incremental and comments:
+        if (type(data) == JSONCDict or type(data) == JSONCList) and data.jsonc_edits is _RESPAN:
+            data = _respan(data)
+        chunks = _iterencode_source(data, indent)
+    else:
+        chunks = _iterencode(data, indent, comments)
+    if comments and (type(data) == JSONCDict or type(data) == JSONCList) and data._root_comments:
+        return _with_root_comments(chunks, data._root_comments)
+    return chunks
+
+def _with_root_comments(chunks, root_comments):
+    """
+    Write the comments before and after the root of a document around its chunks
+    """
+    before, after = root_comments
+    for style, text in before:
+        yield _COMMENT_FORMATS[style].format(text) + '\n'
+    yield from chunks
+    for index, (style, text) in enumerate(after):
+        yield (' ' if index == 0 and style.startswith('inline_') else '\n') + _COMMENT_FORMATS[style].format(text)
+
+def dumps(data, indent=4, comments=True, incremental=False):
+    """
+    Write the JSONCDict to a string
+
+    With incremental set the parts of the source text that have not changed are copied instead of
+    being written out again, which keeps their formatting
+    """
+    _check_indent(indent)
+    profiler = _profiler
+    if profiler is None:
+        return ''.join(_encoder(data, indent, comments, incremental))
+    start = time.perf_counter()
+    out = ''.join(_encoder(data, indent, comments, incremental))
+    profiler('encode', {'seconds': time.perf_counter() - start, 'size': len(out)})
+    return out
+
+def dump(data, stream, indent=4, comments=True, incremental=False):
+    """
+    Write the JSONCDict to a file, see dumps for incremental
+    """
+    _check_indent(indent)
+    profiler = _profiler
+    if profiler is not None:
+        stream = _TimedWriter(stream)
+        start = time.perf_counter()
+    chunks = []
+    for chunk in _encoder(data, indent, comments, incremental):
+        chunks.append(chunk)
+        if len(chunks) >= _WRITE_BATCH:
+            stream.write(''.join(chunks))
+            chunks = []
+    stream.write(''.join(chunks))
+    if profiler is not None:
+        # encoding and writing are interleaved, so the encode time is what is left after writing
+        seconds = time.perf_counter() - start
+        profiler('encode', {'seconds': seconds - stream.seconds, 'size': stream.size})
+        profiler('write', {'seconds': stream.seconds, 'size': stream.size, 'writes': stream.writes})
+
+class _TimedWriter(object):
+    """
+    Wrap a stream to time the writes made to it
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.seconds = 0.0
+        self.size = 0
+        self.writes = 0
+
+    def write(self, text):
+        start = time.perf_counter()
+        self.stream.write(text)
+        self.seconds += time.perf_counter() - start
+        self.size += len(text)
+        self.writes += 1
+
+def _decode_error(msg, pos, line, line_start):
+    """
+    Build the JSONDecodeError for a position of a stream, whose text is not kept to count the
+    lines in like json does
+    """
+    err = json.JSONDecodeError(msg, '', pos)
+    err.lineno = line
+    err.colno = pos - line_start + 1
+    err.args = (f'{msg}: line {err.lineno} column {err.colno} (char {pos})',)
+    return err
+
+def _iter_tokens(stream, chunk_size):
+    """
+    Split a stream into (kind, value, newline, position, line, line_start) tokens, reading it in
+    chunks, where line_start is the position of the start of the line
+    """
+
+    buffer = ''
+    pos = 0
+    # position of the start of the buffer in the stream
+    offset = 0
+    eof = False
+    decoder = None
+    # whether a newline was seen since the last token
+    newline = False
+    # number of the current line and the position it starts at, for the errors
+    line = 1
+    line_start = 0
+
+    while True:
+        ws_end = _WHITESPACE.match(buffer, pos).end()
+        if ws_end != pos:
+            newlines = buffer.count('\n', pos, ws_end)
+            if newlines:
+                newline = True
+                line += newlines
+                line_start = offset + buffer.rindex('\n', pos, ws_end) + 1
+            pos = ws_end
+        if eof:
+            if pos == len(buffer):
+                return
+            need_more = False
+        else:
+            # make sure a whole literal or comment opener fits before looking at the next token
+            need_more = len(buffer) - pos < _MAX_LITERAL
+
+        token = None
+        start = pos
+        if not need_more:
+            char = buffer[pos]
+            if char in '{}[]:,':
+                token = (char, None)
+                pos += 1
+            elif char == '"':
+                try:
+                    value, end = scanstring(buffer, pos + 1)
+                    token = ('string', value)
+                    pos = end
+                except json.JSONDecodeError as err:
+                    if eof:
+                        raise _decode_error(err.msg, offset + err.pos, line, line_start)
+                    need_more = True
+            elif char == '#' or buffer.startswith('//', pos):
+                end = buffer.find('\n', pos)
+                if end == -1 and not eof:
+                    need_more = True
+                else:
+                    if end == -1:
+                        end = len(buffer)
+                    text_start = pos + (1 if char == '#' else 2)
+                    pos = end
+                    if buffer[end - 1:end] == '\r':
+                        end -= 1
+                    token = ('comment', ('python' if char == '#' else 'c', buffer[text_start:end]))
+            elif buffer.startswith('/*', pos):
+                end = buffer.find('*/', pos + 2)
+                if end == -1:
+                    if eof:
+                        raise _decode_error('Unterminated block comment', offset + pos, line, line_start)
+                    need_more = True
+                else:
+                    token = ('comment', ('block_c', buffer[pos + 2:end]))
+                    pos = end + 2
+            else:
+                match = NUMBER_RE.match(buffer, pos)
+                if match is not None:
+                    if match.end() == len(buffer) and not eof:
+                        need_more = True
+                    else:
+                        integer, frac, exp = match.groups()
+                        if frac or exp:
+                            token = ('value', float(integer + (frac or '') + (exp or '')))
+                        else:
+                            token = ('value', int(integer))
+                        pos = match.end()
+                else:
+                    for literal, value in _LITERALS:
+                        if buffer.startswith(literal, pos):
+                            token = ('value', value)
+                            pos += len(literal)
+                            break
+                    else:
+                        raise _decode_error('Expecting value', offset + pos, line, line_start)
+
+        if token is not None:
+            yield token[0], token[1], newline, offset + start, line, line_start
+            newline = False
+            if token[0] == 'comment' and token[1][0] == 'block_c':
+                newlines = buffer.count('\n', start, pos)
+                if newlines:
+                    line += newlines
+                    line_start = offset + buffer.rindex('\n', start, pos) + 1
+            continue
+
+        # read at least as much as is left over so long tokens are not rescanned too often
+        chunk = stream.read(max(chunk_size, len(buffer) - pos))
+        if type(chunk) != str:
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(json.detect_encoding(chunk))()
+            chunk = decoder.decode(chunk, final=not chunk)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        offset += pos
+        pos = 0
+
+# default number of characters or bytes read from a stream at a time
+_CHUNK_SIZE = 65536
+
+_LITERALS = (
+    ('true', True),
+    ('false', False),
+    ('null', None),
+    ('NaN', float('nan')),
+    ('Infinity', float('inf')),
+    ('-Infinity', float('-inf'))
+)
+_MAX_LITERAL = 9
+
+def _iter_events(tokens):
+    """
+    Turn tokens into (prefix, event, value) tuples
+    """
+
+    # each entry holds whether the container is a dictionary and its prefix
+    stack = []
+    is_map = False
+    prefix = ''
+    key = None
+    state = _EXPECT_VALUE
+    line_has_value = False
+    position = 0
+    line = 1
+    line_start = 0
+
+    for kind, value, newline, position, line, line_start in tokens:
+        if newline:
+            line_has_value = False
+
+        if kind == 'comment':
+            style, text = value
+            if line_has_value:
+                style = 'inline_' + style
+            yield prefix, 'comment', (style, text)
+            continue
+
+        if state == _EXPECT_COMMA:
+            if kind == ',':
+                state = _EXPECT_KEY if is_map else _EXPECT_VALUE
+                continue
+            if (kind == '}' and is_map) or (kind == ']' and not is_map):
+                pass
+            elif not line_has_value:
+                # tolerate a missing comma when the next entry starts on a new line
+                state = _EXPECT_KEY if is_map else _EXPECT_VALUE
+            else:
+                raise _decode_error("Expecting ',' delimiter", position, line, line_start)
+
+        if state == _EXPECT_COLON:
+            if kind != ':':
+                raise _decode_error("Expecting ':' delimiter", position, line, line_start)
+            state = _EXPECT_VALUE
+            continue
+
+        if state == _EXPECT_END:
+            raise _decode_error('Extra data', position, line, line_start)
+
+        if kind == '}' or kind == ']':
+            if not stack or (kind == '}') != is_map or (is_map and state == _EXPECT_VALUE):
+                raise _decode_error('Unexpected closing bracket', position, line, line_start)
+            yield prefix, 'end_map' if is_map else 'end_array', None
+            stack.pop()
+            if stack:
+                is_map, prefix = stack[-1]
+                state = _EXPECT_COMMA
+            else:
+                state = _EXPECT_END
+            line_has_value = True
+            continue
+
+        if state == _EXPECT_KEY:
+            if kind != 'string':
+                raise _decode_error('Expecting property name enclosed in double quotes', position, line, line_start)
+            key = value
+            yield prefix, 'key', key
+            state = _EXPECT_COLON
+            continue
+
+        if not stack:
+            value_prefix = ''
+        elif is_map:
+            value_prefix = prefix + '.' + key if prefix else key
+        else:
+            value_prefix = prefix + '.item' if prefix else 'item'
+
+        if kind == '{' or kind == '[':
+            is_map = kind == '{'
+            prefix = value_prefix
+            stack.append((is_map, prefix))
+            yield prefix, 'start_map' if is_map else 'start_array', None
+            state = _EXPECT_KEY if is_map else _EXPECT_VALUE
+            line_has_value = False
+            continue
+        if kind != 'string' and kind != 'value':
+            raise _decode_error('Expecting value', position, line, line_start)
+        yield value_prefix, 'value', value
+        if stack:
+            state = _EXPECT_COMMA
+        else:
+            state = _EXPECT_END
+        line_has_value = True
+
+    if state != _EXPECT_END:
+        raise _decode_error('Expecting value', position, line, line_start)
+
+def _build(event, events):
+    """
+    Build the JSONCDict or JSONCList that starts with event from the rest of the events
+    """
+
+    node = JSONCDict() if event == 'start_map' else JSONCList()
+    root = node
+    stack = []
+    key = None
+    # whether a key has been read but not its value yet
+    awaiting_value = False
+    pending = None
+
+    for _, event, value in events:
+        if event == 'key':
+            key = value
+            if key in _INVALID_KEYS:
+                raise KeyError(f'Key "{key}" in not allowed for a JSONCDict')
+            awaiting_value = True
+            if pending is not None:
+                node.jsonc_comments.setdefault(key, []).extend(pending)
+                pending = None
+            continue
+        if event == 'comment':
+            pending = _place_comment(node, key, pending, value, awaiting_value)
+            continue
+        if event == 'end_map' or event == 'end_array':
+            if pending is not None:
+                if type(node) == JSONCDict:
+                    node.jsonc_comments.setdefault(None, []).extend(pending)
+                else:
+                    node._comment_slots = _comment_slots(len(node), pending)
+            if not stack:
+                return root
+            node, key, pending = stack.pop()
+            continue
+
+        if event == 'start_map' or event == 'start_array':
+            child = JSONCDict() if event == 'start_map' else JSONCList()
+            child.jsonc_parent = node
+            child.jsonc_key = key if type(node) == JSONCDict else len(node)
+            value = child
+        if type(node) == JSONCDict:
+            dict.__setitem__(node, key, value)
+            awaiting_value = False
+        else:
+            list.append(node, value)
+        if event == 'start_map' or event == 'start_array':
+            stack.append((node, key, pending))
+            node = value
+            pending = None
+
+    raise json.JSONDecodeError('Expecting value', '', 0)
+
+def _iter_items(events, prefix):
+    """
+    Build the values found at prefix
+    """
+    for current, event, value in events:
+        if current != prefix:
+            continue
+        if event == 'start_map' or event == 'start_array':
+            yield _build(event, events)
+        elif event == 'value':
+            yield value
+
+def iterparse(stream, prefix=None, chunk_size=_CHUNK_SIZE):
+    """
+    Parse a JSONC file incrementally
+
+    Yields (prefix, event, value) tuples where event is one of start_map, key, value, end_map,
+    start_array, end_array and comment. If prefix is given, the values found at that prefix are
+    built and yielded instead, e.g. prefix='servers.item' yields each item of the "servers" list
+    """
+    events = _iter_events(_iter_tokens(stream, chunk_size))
+    if prefix is None:
+        return events
+    return _iter_items(events, prefix)
+
+def _pack(tree):
+    """
+    Copy a tree into plain containers and a list of (index, comments) for the containers with
+    comments, where index counts the containers in the order they are walked. The comments before
+    and after the root are listed with an index of None
+    """
+    if not isinstance(tree, _CONTAINER_TYPES):
+        return tree, []
+    root = _plain_copy(tree)
+    comments = []
+    if type(tree) in (JSONCDict, JSONCList) and tree._root_comments is not None:
+        comments.append((None, tuple(list(entries) for entries in tree._root_comments)))
+    index = 0
+    stack = [(tree, root)]
+    while stack:
+        node, out = stack.pop()
+        if type(node) == JSONCDict and node._comments:
+            table = node._comments
+            if node.jsonc_parent is _SHARED:
+                # the comments of frozen nodes are tuples, the copy gets lists that can be changed
+                table = {key: list(entries) for key, entries in table.items()}
+            comments.append((index, table))
+        elif type(node) == JSONCList and node._comment_slots is not None:
+            table = node._comment_slots
+            if node.jsonc_parent is _SHARED:
+                table = [entries and list(entries) for entries in table]
+            comments.append((index, table))
+        index += 1
+        for key, value in list(out.items() if type(out) == dict else enumerate(out)):
+            if isinstance(value, _CONTAINER_TYPES):
+                copy = _plain_copy(value)
+                out[key] = copy
+                stack.append((value, copy))
+    return root, comments
+
+def _plain_copy(node):
+    """
+    Shallow copy a node into a plain dict or list
+    """
+    if isinstance(node, dict):
+        return dict(dict.items(node))
+    return list(list.__iter__(node))
+
+def _unpack(packed):
+    """
+    Build the tree that _pack was given
+    """
+    root, comments = packed
+    if type(root) != dict and type(root) != list:
+        return root
+    comments = dict(comments)
+    top = _to_node(root, None, None)
+    top._root_comments = comments.pop(None, None)
+    index = 0
+    stack = [top]
+    while stack:
+        node = stack.pop()
+        table = comments.get(index)
+        index += 1
+        if type(node) == JSONCDict:
+            if table is not None:
+                node._comments = table
+            entries = list(dict.items(node))
+        else:
+            if table is not None:
+                node._comment_slots = table
+            entries = enumerate(list.copy(node))
+        for key, value in entries:
+            if type(value) == dict or type(value) == list:
+                child = _to_node(value, node, key)
+                if type(node) == JSONCDict:
+                    dict.__setitem__(node, key, child)
+                else:
+                    list.__setitem__(node, key, child)
+                stack.append(child)
+    return top
+
+def _load_one(path):
+    """
+    Load a file for load_many, returning the error instead of raising it
+    """
+    try:
+        return load_path(path, mmap=False), None
+    except Exception as err:
+        return None, err
+
+def _new_pool(executor, workers):
+    """
+    Create the pool of workers for 'process' or 'thread', or None when an Executor is given
+    """
+    if executor == 'process':
+        return concurrent.futures.ProcessPoolExecutor(workers)
+    if executor == 'thread':
+        return concurrent.futures.ThreadPoolExecutor(workers)
+    if isinstance(executor, concurrent.futures.Executor):
+        return None
+    raise ValueError(f'Unknown executor "{executor}", expected "process", "thread" or an Executor')
+
+def load_many(paths, workers=None, executor='process', ordered=True):
+    """
+    Load many files in a pool of workers, yielding (path, data, error) for each of them
+
+    The executor can be 'process', 'thread' or a concurrent.futures.Executor. With ordered set the
+    files come back in the order of paths, otherwise as they finish. A file that fails to load has
+    its exception as the error and None as the data, the other files are still loaded
+    """
+    paths = list(paths)
+    pool = _new_pool(executor, workers)
+    futures = {(pool or executor).submit(_load_one, path): path for path in paths}
+    try:
+        done = futures if ordered else concurrent.futures.as_completed(futures)
+        for future in done:
+            data, err = future.result()
+            yield futures[future], data, err
+    finally:
+        for future in futures:
+            future.cancel()
+        if pool is not None:
+            pool.shutdown()
+
+def _line_events(stream):
+    """
+    Split a JSONC Lines stream into ('comment', (style, text)) events for the comment lines and
+    (line number, text) pairs for the record lines
+    """
+    block = None
+    for lineno, line in enumerate(stream, 1):
+        if block is not None:
+            end = line.find('*/')
+            if end == -1:
+                block.append(line)
+                continue
+            block.append(line[:end])
+            yield 'comment', ('block_c', ''.join(block))
+            block = None
+            line = line[end + 2:]
+        line = line.lstrip()
+        while line.startswith('/*'):
+            end = line.find('*/', 2)
+            if end == -1:
+                block = [line[2:]]
+                break
+            yield 'comment', ('block_c', line[2:end])
+            line = line[end + 2:].lstrip()
+        if block is not None:
+            continue
+        line = line.rstrip()
+        if not line:
+            continue
+        if line[0] == '#':
+            yield 'comment', ('python', line[1:])
+        elif line.startswith('//'):
+            yield 'comment', ('c', line[2:])
+        else:
+            yield lineno, line
+    if block is not None:
+        raise json.JSONDecodeError('Unterminated block comment', ''.join(block), 0)
+
+# matches a record up to a comment that runs to the end of its line
+_RECORD_END = re.compile(r'''(?:[^"/#]+|"[^"\\]*(?:\\.[^"\\]*)*"|/\*[\s\S]*?\*/|/(?![/*]))*''')
+
+def _parse_line(lineno, text, preserve_comments):
+    """
+    Parse the record on a line, returning it with the comment at the end of the line if any
+    """
+    end = _RECORD_END.match(text).end()
+    comment = None
+    if end < len(text) and text[end] == '#':
+        comment = ('inline_python', text[end + 1:])
+        text = text[:end]
+    elif text.startswith('//', end):
+        comment = ('inline_c', text[end + 2:])
+        text = text[:end]
+    try:
+        return loads(text, preserve_comments), comment
+    except json.JSONDecodeError as err:
+        raise json.JSONDecodeError(f'{err.msg} in the record on line {lineno}', err.doc, err.pos) from None
+
+def _parse_lines(items, preserve_comments):
+    """
+    Parse a batch of the items of _line_events into iter_lines events
+    """
+    events = []
+    for item in items:
+        if type(item[0]) == str:
+            events.append(item)
+            continue
+        record, comment = _parse_line(item[0], item[1], preserve_comments)
+        events.append(('record', record))
+        if comment is not None:
+            events.append(('comment', comment))
+    return events
+
+def iter_lines(stream, comments=False, preserve_comments=True, executor=None, workers=None,
+               batch_size=1000):
+    """
+    Read JSONC Lines, one JSONC value per line, from a stream and yield the records as they are read
+
+    With comments set the comment lines between the records are kept and ('record', value) and
+    ('comment', (style, text)) events are yielded in the order they are found instead, a comment at
+    the end of a record's line comes right after it with an inline_ style. preserve_comments is
+    passed on to loads for each record.
+
+    With executor set to 'process', 'thread' or a concurrent.futures.Executor the records are
+    parsed by a pool of workers in batches of batch_size lines. The records still come back in
+    order and only a few batches per worker are read ahead, so memory use does not grow with the
+    size of the stream
+    """
+    items = _line_events(stream)
+    if executor is None:
+        for item in items:
+            if type(item[0]) == str:
+                if comments:
+                    yield item
+                continue
+            record, comment = _parse_line(item[0], item[1], preserve_comments)
+            if not comments:
+                yield record
+                continue
+            yield 'record', record
+            if comment is not None:
+                yield 'comment', comment
+        return
+
+    pool = _new_pool(executor, workers)
+    limit = 2 * (workers or os.cpu_count() or 1)
+    window = collections.deque()
+    try:
+        while True:
+            batch = list(itertools.islice(items, batch_size))
+            if batch:
+                window.append((pool or executor).submit(_parse_lines, batch, preserve_comments))
+            # once the window is full, or everything has been read, wait for the oldest batch
+            while window and (not batch or len(window) >= limit):
+                for event in window.popleft().result():
+                    if comments:
+                        yield event
+                    elif event[0] == 'record':
+                        yield event[1]
+            if not batch:
+                break
+    finally:
+        for future in window:
+            future.cancel()
+        if pool is not None:
+            pool.shutdown()
+
+def dump_lines(iterable, stream, comments=False):
+    """
+    Write records to a stream as JSONC Lines, one record per line, as they are taken from iterable
+
+    With comments set the items are the events iter_lines yields with comments set, so that the
+    comment lines are written back between the records. Comments inside of the records are not
+    written, as each record has to fit on one line
+    """
+    chunks = []
+    newline = ''
+    for item in iterable:
+        if comments:
+            event, item = item
+            if event == 'comment':
+                style, text = item
+                if style.startswith('inline_') and newline:
+                    chunks.append(' ' + _COMMENT_FORMATS[style].format(text))
+                else:
+                    chunks.append(newline + _COMMENT_FORMATS[style].format(text))
+                    newline = '\n'
+                continue
+        chunks.append(newline + json.dumps(item))
+        newline = '\n'
+        if len(chunks) >= _WRITE_BATCH:
+            stream.write(''.join(chunks))
+            chunks = []
+    chunks.append(newline)
+    stream.write(''.join(chunks))
+
+class _Cancellable(object):
+    """
+    Wrap a stream so that reading or writing stops once the task waiting on it is cancelled, the
+    event is None when the stream is read in another process
+    """
+
+    def __init__(self, stream, cancelled):
+        self.stream = stream
+        self.cancelled = cancelled
+
+    def read(self, size):
+        if self.cancelled is not None and self.cancelled.is_set():
+            raise asyncio.CancelledError()
+        return self.stream.read(size)
+
+    def write(self, text):
+        if self.cancelled is not None and self.cancelled.is_set():
+            raise asyncio.CancelledError()
+        return self.stream.write(text)
+
+async def _run_in_executor(executor, func, *args):
+    """
+    Run func(cancelled, *args) in the executor, setting the cancelled event if the caller is cancelled
+
+    An event can not be sent to other processes, so executors other than the default one and
+    thread pools get None instead and a call that has started runs to the end
+    """
+    loop = asyncio.get_running_loop()
+    cancelled = None
+    if executor is None or isinstance(executor, concurrent.futures.ThreadPoolExecutor):
+        cancelled = threading.Event()
+    try:
+        return await loop.run_in_executor(executor, func, cancelled, *args)
+    except asyncio.CancelledError:
+        if cancelled is not None:
+            cancelled.set()
+        raise
+
+def _loads_worker(cancelled, text, chunk_size):
+    if chunk_size is None:
+        return loads(text)
+    if isinstance(text, str):
+        return _load_chunks(_Cancellable(io.StringIO(text), cancelled), chunk_size)
+    reader = _BufferReader(text)
+    try:
+        return _load_chunks(_Cancellable(reader, cancelled), chunk_size)
+    finally:
+        reader.view.release()
+
+def _load_worker(cancelled, path, chunk_size):
+    if chunk_size is None:
+        return load_path(path, mmap=False)
+    with open(path, encoding='utf-8') as stream:
+        return _load_chunks(_Cancellable(stream, cancelled), chunk_size)
+
+def _dump_worker(cancelled, data, path, indent, comments):
+    # write next to the file and move it into place so a cancelled or failed dump leaves the
+    # old file untouched
+    temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as stream:
+            dump(data, _Cancellable(stream, cancelled), indent, comments)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+async def aloads(text, executor=None, chunk_size=None):
+    """
+    Initialize a JSONCDict from a string or bytes without blocking the event loop
+
+    The parsing runs in the executor, or the loop's default executor if it is None. With chunk_size
+    set the text is parsed chunk_size characters at a time and cancelling the call stops the
+    parsing at the next chunk, otherwise the parsing runs to the end even once cancelled. Parsing
+    in a process pool always runs to the end once it has started
+    """
+    return await _run_in_executor(executor, _loads_worker, text, chunk_size)
+
+async def aload(path, executor=None, chunk_size=None):
+    """
+    Initialize a JSONCDict from a file path without blocking the event loop, see aloads
+    """
+    return await _run_in_executor(executor, _load_worker, path, chunk_size)
+
+async def adump(data, path, indent=4, comments=True, executor=None):
+    """
+    Write the JSONCDict to a file path without blocking the event loop
+
+    The file is replaced once it has been written completely, cancelling the call stops the
+    writing and keeps the old file
+    """
+    _check_indent(indent)
+    await _run_in_executor(executor, _dump_worker, data, path, indent, comments)
+
+_COMMENT_KEY_PATTERN = re.compile(r'\.jsonc_(inline_c|inline_python|inline_block_c|block_c|c|python)_comment_[a-z0-9]{8}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{12}')
+
+def _read_comment(style, text):
+    """
+    Turn a stored `.jsonc_*` comment back into a (style, text) tuple
+    """
+    if style.endswith('block_c'):
+        text = text.replace('<JSONC_WINDOWS_NEWLINE>', '\r\n').replace('<JSONC_LINUX_NEWLINE>', '\n')
+    return (style, text)
+
+def clean_comments(data):
+    """
+    Convert a tree with `.jsonc_*` comment entries into JSONCDict/JSONCList nodes
+    """
+    if type(data) != dict and type(data) != list:
+        return data
+    top = JSONCDict() if type(data) == dict else JSONCList()
+    stack = [(data, top)]
+    while stack:
+        data, out = stack.pop()
+        if type(data) == dict:
+            pending = []
+            last_key = None
+            for k, v in data.items():
+                # the slice is a cheap test that rules out most entries before the pattern
+                match = _COMMENT_KEY_PATTERN.match(k) if type(k) == str and k[:7] == '.jsonc_' else None
+                if match is None:
+                    if type(v) == dict or type(v) == list:
+                        child = JSONCDict() if type(v) == dict else JSONCList()
+                        child.jsonc_parent = out
+                        child.jsonc_key = k
+                        stack.append((v, child))
+                        v = child
+                    dict.__setitem__(out, k, v)
+                    if pending:
+                        out.jsonc_comments.setdefault(k, []).extend(pending)
+                        pending = []
+                    last_key = k
+                    continue
+                style = match.group(1)
+                if style.startswith('inline_') and last_key is not None:
+                    out.jsonc_comments.setdefault(last_key, []).append(_read_comment(style, v))
+                else:
+                    pending.append(_read_comment(style, v))
+            if pending:
+                out.jsonc_comments.setdefault(None, []).extend(pending)
+        else:
+            comments = {}
+            for x in data:
+                match = _COMMENT_KEY_PATTERN.match(x) if type(x) == str and x[:7] == '.jsonc_' else None
+                if match is None:
+                    if type(x) == dict or type(x) == list:
+                        child = JSONCDict() if type(x) == dict else JSONCList()
+                        child.jsonc_parent = out
+                        child.jsonc_key = len(out)
+                        stack.append((x, child))
+                        x = child
+                    list.append(out, x)
+                    continue
+                style = match.group(1)
+                index = len(out)
+                if style.startswith('inline_') and index > 0:
+                    index -= 1
+                comments.setdefault(index, []).append(_read_comment(style, x[match.end() + 2:]))
+            out._comment_slots = _comment_slots(len(out), comments)
+    return top
@@ -1,3 +1,12 @@
+import asyncio
+import concurrent.futures
+import io
+import json
+import os
+import pickle
+import sys
+import tempfile
+
 import jsonc
 
 with open('test/test.in.jsonc') as f:
@@ -92,4 +101,562 @@ except:
     success = True
 assert(success)
 
+print('Test 13')
+data = jsonc.loads("""{"a": {"b": {"c": [1, 2]}}}""")
+assert(data['a'] is data['a'])
+assert(data['a']['b']['c'] is data['a']['b']['c'])
+
+print('Test 14')
+data['d'] = {'e': {'f': 1}, 'g': [{'h': 2}]}
+assert(data['d'] is data['d'])
+data['d']['e']['f'] = 3
+data['d']['g'][0]['h'] = 4
+assert(data['d']['e']['f'] == 3)
+assert(data['d']['g'][0]['h'] == 4)
+assert(type(data['d']['g'][0]) == jsonc.JSONCDict)
+
+print('Test 15')
+data = jsonc.loads("""{"a": {"b": {"c": 1}}, "d": {"e": [1, 2]}}""")
+with data.batch():
+    for i in range(100):
+        data['a']['b'][f'key{i}'] = i
+    assert(not data.jsonc_dirty)
+assert(data['a']['b']['key99'] == 99)
+assert(data.jsonc_dirty and data['a'].jsonc_dirty and data['a']['b'].jsonc_dirty)
+assert(not data['d'].jsonc_dirty)
+data['d']['e'].append(3)
+assert(data['d'].jsonc_dirty and data['d']['e'].jsonc_dirty)
+
+print('Test 16')
+data['a'].update({'x': 1}, y=2)
+assert(data['a']['x'] == 1 and data['a']['y'] == 2)
+
+print('Test 17')
+with open('test/test.in.jsonc') as f:
+    text = jsonc.dumps(jsonc.load(f))
+assert(jsonc.dumps(jsonc.loads(text)) == text)
+stream = io.StringIO()
+jsonc.dump(jsonc.loads(text), stream)
+assert(stream.getvalue() == text)
+
+print('Test 18')
+with open('test/test.in.jsonc') as f:
+    events = list(jsonc.iterparse(f, chunk_size=16))
+assert(events[0] == ('', 'start_map', None))
+assert(('', 'comment', ('python', ' this is another test comment')) in events)
+assert(('bar', 'comment', ('inline_c', ' this is an inline comment')) in events)
+with open('test/test.in.jsonc') as f:
+    items = list(jsonc.iterparse(f, prefix='foo.item', chunk_size=16))
+assert(items[:2] == ['a', 'b'] and items[3]['c'] == '{this is a test}')
+with open('test/test.in.jsonc') as f:
+    root = list(jsonc.iterparse(f, prefix=''))[0]
+with open('test/test.in.jsonc') as f:
+    assert(jsonc.dumps(root) == jsonc.dumps(jsonc.load(f)))
+
+print('Test 19')
+with open('test/test.in.jsonc') as f:
+    text = f.read()
+expected = jsonc.dumps(jsonc.loads(text))
+assert(jsonc.dumps(jsonc.loads(text.encode('utf-8'))) == expected)
+assert(jsonc.dumps(jsonc.loads(memoryview(text.encode('utf-8')))) == expected)
+assert(jsonc.dumps(jsonc.load_path('test/test.in.jsonc')) == expected)
+assert(jsonc.dumps(jsonc.load_path('test/test.in.jsonc', mmap=False)) == expected)
+
+print('Test 20')
+with jsonc.profile() as stats:
+    with open('test/test.in.jsonc') as f:
+        data = jsonc.load(f)
+    data['bar']['a'] = {'b': [1]}
+    data['bar']['a']['b']
+    jsonc.dump(data, io.StringIO())
+assert(stats.phases['read']['size'] == len(text))
+assert(stats.phases['parse']['comments'] == 12)
+assert(stats.phases['mark_dirty']['depth'] == 2)
+assert(stats.phases['convert']['calls'] == 2)
+assert(stats.phases['write']['size'] == stats.phases['encode']['size'])
+assert(jsonc.set_profiler(None) is None)
+
+print('Test 21')
+jsonc.cache_clear()
+first = jsonc.load_cached('test/test.in.jsonc')
+second = jsonc.load_cached('test/test.in.jsonc')
+assert(first is not second)
+first['bar']['a'] = 'changed'
+first['foo'][2]['a'] = 'changed'
+first['foo'].append('c')
+assert(jsonc.dumps(jsonc.load_cached('test/test.in.jsonc')) == expected)
+assert(second['bar']['a'] == 'b' and second['foo'][2]['a'] == 'b')
+info = jsonc.cache_info()
+assert(info['hits'] == 2 and info['misses'] == 1 and info['entries'] == 1)
+jsonc.set_cache_limits(max_entries=0)
+assert(jsonc.cache_info()['entries'] == 0)
+jsonc.set_cache_limits(max_entries=128)
+jsonc.cache_clear()
+
+print('Test 22')
+data = jsonc.load_path('test/test.in.jsonc')
+assert(jsonc.dumps(pickle.loads(pickle.dumps(data))) == expected)
+paths = ['test/test.in.jsonc', 'test/missing.jsonc', 'test/test.in.jsonc']
+for executor in ['thread', 'process']:
+    results = list(jsonc.load_many(paths, workers=2, executor=executor))
+    assert([path for path, _, _ in results] == paths)
+    assert(jsonc.dumps(results[0][1]) == expected and results[0][2] is None)
+    assert(results[1][1] is None and type(results[1][2]) == FileNotFoundError)
+results = list(jsonc.load_many(paths, executor='thread', ordered=False))
+assert(sorted(path for path, _, _ in results) == sorted(paths))
+
+# files written by the tests below go to a directory removed on exit
+scratch = tempfile.TemporaryDirectory()
+out_path = os.path.join(scratch.name, 'test.out.jsonc')
+
+print('Test 23')
+async def load_and_dump():
+    data = await jsonc.aload('test/test.in.jsonc')
+    assert(jsonc.dumps(data) == expected)
+    data = await jsonc.aloads(text, chunk_size=16)
+    assert(jsonc.dumps(data) == expected)
+    await jsonc.adump(data, out_path)
+    with open(out_path) as f:
+        assert(f.read() == expected)
+    task = asyncio.ensure_future(jsonc.aloads(text * 1000, chunk_size=16))
+    await asyncio.sleep(0)
+    task.cancel()
+    try:
+        await task
+        assert(False)
+    except asyncio.CancelledError:
+        pass
+asyncio.run(load_and_dump())
+assert([name for name in os.listdir(scratch.name) if name.endswith('.tmp')] == [])
+async def in_processes():
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as pool:
+        data = await jsonc.aload('test/test.in.jsonc', executor=pool, chunk_size=16)
+        assert(jsonc.dumps(data) == expected)
+        data = await jsonc.aloads(text.encode(), executor=pool)
+        assert(jsonc.dumps(data) == expected)
+        await jsonc.adump(data, out_path, executor=pool)
+    with open(out_path) as f:
+        assert(f.read() == expected)
+asyncio.run(in_processes())
+
+print('Test 24')
+data = jsonc.loads(text)
+assert(jsonc.dumps(data, incremental=True) == text.rstrip())
+data['bar']['f'] = 10
+data['foo'][3]['d'] = 'e'
+out = jsonc.dumps(data, incremental=True)
+assert('"h" : {}, // this is an inline comment' in out and '}, {' in out)
+assert('"f": 10,' in out and '"d": "e"' in out)
+assert(jsonc.dumps(jsonc.loads(out)) == jsonc.dumps(data))
+data.pop('hello')
+data.setdefault('new', [1])
+out = jsonc.dumps(data, incremental=True)
+assert(jsonc.dumps(jsonc.loads(out)) == jsonc.dumps(data))
+assert(jsonc.dumps(data, incremental=True, comments=False) == jsonc.dumps(data, comments=False))
+
+print('Test 25')
+# every available backend has to read documents exactly like the built-in parser
+documents = [
+    text,
+    '{"a": 1, "b": [1, 2.5, -0, 1e400, -1.5e-10, 0.1], "c": {"d": null, "e": true, "f": false}}',
+    '{"a": 1, "a": 2, "b": 3}',
+    '[12345678901234567890123, -9223372036854775809, 9223372036854775807]',
+    '["\\u00e9\\ud83d\\ude00", "\\ud800", "caf\u00e9", "a\\"b\\\\"]',
+    '[NaN, Infinity, -Infinity]',
+    '  "top level string"  ',
+    '42',
+    '[]',
+    '{"a": [1, 2,]}',
+    '{"jsonc_key": 1}',
+    '{"jsonc\\u005fkey": 1}',
+    '{"a": 1',
+    '{"a": "b\tc"}',
+    '',
+]
+
+def read(document):
+    try:
+        data = jsonc.loads(document)
+        return repr(jsonc.dumps(data)) + repr(type(data))
+    except Exception as err:
+        return type(err)
+def edit_incremental(document):
+    data = jsonc.loads(document)
+    outputs = [jsonc.dumps(data, incremental=True)]
+    data['c'] = 't'
+    outputs.append(jsonc.dumps(data, incremental=True))
+    data['b'].jsonc_comments = {'x': [('c', ' note')]}
+    data['a'].append(4)
+    outputs.append(jsonc.dumps(data, incremental=True))
+    return outputs
+plain = '{\n  "a":   [1,2,   3],\n  "b": {"x":  1},\n  "c": "s"\n}'
+previous = jsonc.set_backend('json')
+expected_results = [read(document) for document in documents]
+expected_incremental = edit_incremental(plain)
+assert(expected_incremental[:2] == [plain, plain.replace('"s"', '"t"')])
+for backend in jsonc.available_backends():
+    jsonc.set_backend(backend)
+    assert(jsonc.get_backend() == backend)
+    for document, expected_result in zip(documents, expected_results):
+        assert(read(document) == expected_result), (backend, document)
+        assert(read(document.encode('utf-8')) == expected_result), (backend, document)
+    assert(edit_incremental(plain) == edit_incremental(plain.encode('utf-8')) == expected_incremental), backend
+    assert(jsonc.dumps(jsonc.load_path('test/test.in.jsonc')) == expected)
+jsonc.set_backend(previous)
+assert(read('{"jsonc_key": 1}') == KeyError)
+with open(out_path, 'w') as f:
+    f.write('{"a": {"jsonc_parent": 1}}')
+for mmap in (True, False):
+    try:
+        jsonc.load_path(out_path, mmap=mmap)
+        assert(False)
+    except KeyError:
+        pass
+
+print('Test 26')
+data = jsonc.loads(text)
+assert(data.get_path('bar.f') == 9 and data.get_path('foo[2].a') == 'b')
+assert(data.get_path('$.foo[-1]["c"]') == '{this is a test}')
+assert(data.get_path('foo[9]', None) is None)
+try:
+    data.get_path('bar.missing')
+    assert(False)
+except KeyError:
+    pass
+assert(data.find('$..a') == ['b', 'b'])
+assert(data.find('$.foo[*]')[:2] == ['a', 'b'])
+assert(data.find('$.foo..c') == ['{this is a test}'])
+data['bar']['new'] = {'a': 'added', 'list': [{'a': 'nested'}]}
+assert(data.find('$..a') == ['b', 'b', 'added', 'nested'])
+del data['bar']['new']['list']
+data['foo'].insert(0, {'a': 'inserted'})
+data['foo'][3] = 'replaced'
+assert(sorted(data.find('$..a')) == ['added', 'b', 'inserted'])
+data['bar'].clear()
+assert(data.find('$..a') == ['inserted'])
+
+print('Test 27')
+plain = json.loads(jsonc.dumps(jsonc.loads(text), comments=False))
+assert(jsonc.loads(text, preserve_comments=False) == plain)
+assert(type(jsonc.loads(text, preserve_comments=False)) == dict)
+assert(jsonc.loads(text.encode('utf-8'), preserve_comments=False) == plain)
+with open('test/test.in.jsonc') as f:
+    assert(jsonc.load(f, preserve_comments=False) == plain)
+assert(jsonc.load_path('test/test.in.jsonc', preserve_comments=False) == plain)
+stripped = jsonc.strip('{"a": "// not a comment", # comment\n "b": [1, 2, /* comment */],}')
+assert(json.loads(stripped) == {'a': '// not a comment', 'b': [1, 2]})
+for invalid in ['[,]', '{,}', '[1,,]', '{"a": 1} /', '/* unterminated', '[1/* c */2]', '{"a": 1/**/0}']:
+    try:
+        jsonc.loads(invalid, preserve_comments=False)
+        assert(False), invalid
+    except json.JSONDecodeError:
+        pass
+
+print('Test 28')
+depth = sys.getrecursionlimit() * 3
+deep = jsonc.loads('{"a": ' * depth + '[1, // comment\n2]' + '}' * depth)
+tree = deep.jsonc_with_comments
+restored = jsonc.clean_comments(tree)
+node = restored
+for _ in range(depth):
+    node = node['a']
+assert(list(node) == [1, 2] and node.jsonc_comments == {0: [('inline_c', ' comment')]})
+fixed, dtypes = jsonc.JSONCDict.fix_types(deep)
+assert(jsonc.dumps(deep.__restore_types__(fixed, dtypes)) == jsonc.dumps(deep, comments=False))
+assert(jsonc.loads('[' * depth + ']' * depth, preserve_comments=False) is not None)
+odd = {1: {2.5: [True, {3: 'x', 0.5: 'y'}]}, 'b': [[1], {}]}
+fixed, dtypes = jsonc.JSONCDict.fix_types(odd)
+assert(fixed == {1: {2.5: [True, {'3': 'x', '0.5': 'y'}]}, 'b': [[1], {}]})
+assert(dtypes == {1: {2.5: ['N/A', {'3': 'int', '0.5': 'float'}]}, 'b': [['N/A'], {}]})
+assert(jsonc.JSONCDict().__restore_types__(fixed, dtypes) == odd)
+
+print('Test 29')
+lines = '''# first record
+{"id": 1, "tags": ["a", "b"]} # inline
+/* block
+comment */
+{"id": 2, "text": "not a # comment", "list": [1, 2,]}
+
+[3] // last
+'''
+events = list(jsonc.iter_lines(io.StringIO(lines), comments=True))
+assert([event for event, value in events] == ['comment', 'record', 'comment', 'comment', 'record', 'record', 'comment'])
+assert(events[2] == ('comment', ('inline_python', ' inline')) and events[3] == ('comment', ('block_c', ' block\ncomment ')))
+records = list(jsonc.iter_lines(io.StringIO(lines), preserve_comments=False))
+assert(records == [{'id': 1, 'tags': ['a', 'b']}, {'id': 2, 'text': 'not a # comment', 'list': [1, 2]}, [3]])
+assert(type(records[0]) == dict)
+assert(list(jsonc.iter_lines(io.StringIO(lines), preserve_comments=False, executor='thread', batch_size=1)) == records)
+out = io.StringIO()
+jsonc.dump_lines(events, out, comments=True)
+assert(out.getvalue().splitlines()[1] == '{"id": 1, "tags": ["a", "b"]} # inline')
+assert(list(jsonc.iter_lines(io.StringIO(out.getvalue()), comments=True))[2:4] == events[2:4])
+out = io.StringIO()
+jsonc.dump_lines(iter(records), out)
+assert(list(jsonc.iter_lines(io.StringIO(out.getvalue()), preserve_comments=False)) == records)
+try:
+    list(jsonc.iter_lines(io.StringIO('1\n{"a": }\n')))
+    assert(False)
+except json.JSONDecodeError as err:
+    assert('line 2' in err.msg)
+
+print('Test 30')
+old = jsonc.loads('{\n    // the port\n    "port": 80,\n    "hosts": ["a", "b"],\n    "tls": {"on": false}\n}')
+new = jsonc.loads('{"port": 8080, "hosts": ["z", "a", "b"], "tls": {"on": false}, "debug": true}')
+patch = jsonc.diff(old, new)
+assert(patch == [{'op': 'add', 'path': '/debug', 'value': True},
+                 {'op': 'replace', 'path': '/port', 'value': 8080},
+                 {'op': 'add', 'path': '/hosts/0', 'value': 'z'}])
+changes = []
+old.subscribe('/hosts/1', changes.append)
+old.subscribe('/tls', changes.append)
+tls = old['tls']
+old.apply_patch(patch)
+assert(old == new and old['tls'] is tls)
+assert(old.jsonc_comments['port'] == [('c', ' the port')])
+assert(changes == [[patch[2]]])
+assert(jsonc.diff(old, new) == [])
+old.unsubscribe('/hosts/1', changes.append)
+old.apply_patch([{'op': 'move', 'from': '/hosts/0', 'path': '/hosts/-'},
+                 {'op': 'copy', 'from': '/tls', 'path': '/tls2'},
+                 {'op': 'remove', 'path': '/debug'},
+                 {'op': 'test', 'path': '/hosts', 'value': ['a', 'b', 'z']}])
+assert(old['tls2'] == {'on': False} and old['tls2'] is not old['tls'] and 'debug' not in old)
+assert(len(changes) == 1)
+assert(jsonc.diff([0, 1], [False, 1]) == [{'op': 'replace', 'path': '/0', 'value': False}])
+try:
+    old.apply_patch([{'op': 'test', 'path': '/port', 'value': 80}])
+    assert(False)
+except ValueError:
+    pass
+try:
+    old.apply_patch([{'op': 'replace', 'path': '/missing', 'value': 1}])
+    assert(False)
+except KeyError:
+    pass
+partial = [{'op': 'replace', 'path': '/tls/on', 'value': True}, {'op': 'remove', 'path': '/missing'}]
+try:
+    old.apply_patch(partial)
+    assert(False)
+except KeyError:
+    pass
+assert(old['tls']['on'] is True and changes[-1] == partial[:1])
+
+print('Test 31')
+data = jsonc.loads('{\n    // the servers\n    "servers": [{"port": 80}],\n    "limits": {"cpu": 2}\n}')
+data['extra'] = {'plain': [1, 2]}
+frozen = data.freeze()
+assert(frozen == data and frozen.freeze() is frozen and hash(frozen) == hash(data.freeze()))
+assert(frozen['servers'] is frozen['servers'] and frozen['extra']['plain'] == [1, 2])
+assert(dict(frozen.jsonc_comments) == {'servers': (('c', ' the servers'),)})
+try:
+    frozen.jsonc_comments['servers'].append(('c', ' changed'))
+    assert(False)
+except AttributeError:
+    pass
+assert(all(type(slot) == tuple for slot in jsonc.loads('[1, // one\n 2]').freeze().jsonc_comments.values()))
+unpickled = pickle.loads(pickle.dumps(frozen))
+unpickled.jsonc_comments['servers'].append(('c', ' changed'))
+assert(len(frozen.jsonc_comments['servers']) == 1)
+for change in (lambda: frozen.__setitem__('a', 1), lambda: frozen['servers'].append(1),
+               lambda: frozen['limits'].pop('cpu'), lambda: frozen.update(a=1)):
+    try:
+        change()
+        assert(False)
+    except TypeError:
+        pass
+try:
+    hash(data)
+    assert(False)
+except TypeError:
+    pass
+thawed = frozen.thaw()
+thawed['servers'][0]['port'] = 8080
+assert(frozen['servers'][0]['port'] == 80 and thawed['servers'][0]['port'] == 8080)
+snapshot = thawed.freeze()
+assert(snapshot['limits'] is frozen['limits'] and snapshot['servers'] is not frozen['servers'])
+assert(jsonc.dumps(snapshot) == jsonc.dumps(thawed) and snapshot.find('$..port') == [8080])
+assert(data.thaw() is data)
+
+print('Test 32')
+base = jsonc.loads('{\n    // the server\n    "server": {"host": "a", "tls": {"on": false}},\n    "hosts": ["x", "y"]\n}').freeze()
+prod = jsonc.loads('{\n    "server": {\n        // prod port\n        "port": 443\n    },\n    "hosts": ["y", "z"]\n}')
+merged = jsonc.merge(base, prod)
+assert(merged == {'server': {'host': 'a', 'tls': {'on': False}, 'port': 443}, 'hosts': ['y', 'z']})
+assert(merged['server']['tls'] is base['server']['tls'] and merged.freeze() is merged)
+assert(merged.jsonc_comments['server'] == (('c', ' the server'),))
+assert(merged['server'].jsonc_comments['port'] == (('c', ' prod port'),))
+assert(jsonc.merge(base, prod, strategy={'list': 'unique'})['hosts'] == ['x', 'y', 'z'])
+assert(jsonc.merge(base, prod, strategy={'list': 'append', '/server': 'replace'}) == {'server': {'port': 443}, 'hosts': ['x', 'y', 'y', 'z']})
+assert(jsonc.merge([1, True], [True, 1.0], strategy={'list': 'unique'}) == [1, True, 1.0])
+layers = jsonc.Layers(base, prod, strategy={'list': 'prepend'})
+assert(layers.merged['hosts'] == ['y', 'z', 'x', 'y'])
+assert(layers.origin('') == (0, 1) and layers.origin('/server/host') == (0,) and layers.origin('/hosts/0') == (1,))
+assert(layers.origin('/hosts/3') == (0,) and layers.origin('/server/tls/on') == (0,))
+first = layers.merged
+draft = layers[0].thaw()
+draft['server']['host'] = 'b'
+layers[0] = draft.freeze()
+assert(layers.merged['server']['host'] == 'b' and first['server']['host'] == 'a')
+assert(layers.merged['server']['tls'] is first['server']['tls'])
+for bad in ({'list': 'merge'}, {'/server': 'append'}):
+    try:
+        jsonc.merge(base, prod, strategy=bad)
+        assert(False)
+    except ValueError:
+        pass
+try:
+    layers.origin('/server/missing')
+    assert(False)
+except KeyError:
+    pass
+
+print('Test 33')
+data = jsonc.loads('{\n    "a": [1, {"b": [2]}],\n    "l": [\n        3, // three\n        1\n    ]\n}')
+assert(json.dumps(data) == '{"a": [1, {"b": [2]}], "l": [3, 1]}')
+data['a'][1]['b'].append(3)
+assert(isinstance(data['a'], list) and json.dumps(data['a']) == '[1, {"b": [2, 3]}]')
+assert(json.dumps(jsonc.loads('[[1], {"c": []}]')) == '[[1], {"c": []}]')
+data['l'].sort()
+assert(data['l'] == [1, 3] and data['l'].jsonc_comments == {1: [('inline_c', ' three')]})
+data['l'].reverse()
+assert(data['l'] == [3, 1] and data['l'].jsonc_comments == {0: [('inline_c', ' three')]})
+data['l'].reverse()
+data['l'] *= 2
+assert(json.dumps(data['l']) == '[1, 3, 1, 3]' and data['l'].jsonc_dirty)
+
+print('Test 34')
+data = jsonc.loads('{"a": {"t": 1}, "b": {"t": 2}}')
+assert(data.find('$..t') == [1, 2])
+data['c'] = data['a']
+del data['a']
+assert(sorted(data.find('$..t')) == sorted(data.find('$.*.t')) == [1, 2])
+del data['c']
+assert(data.find('$..t') == [2])
+data = jsonc.loads('{"a": {"timeout": 1}, "b": {"x": 2}, "c": [{"timeout": 3}]}')
+assert(data.find('$..timeout') == [1, 3])
+sub = data['b']
+del data['b']
+sub['timeout'] = 99
+assert(sub.jsonc_parent is None and data.find('$..timeout') == [1, 3])
+item = data['c'].pop()
+item['timeout'] = 4
+data.pop('a')['timeout'] = 5
+assert(item.jsonc_parent is None and data.find('$..timeout') == [])
+items = jsonc.loads('[{"a": 1}, {"b": 2}]')
+first, second = items[0], items[1]
+items.append(first)
+items[0], items[1] = items[1], items[0]
+del items[1]
+assert(first.jsonc_parent is items and second.jsonc_parent is items)
+items.pop()
+assert(first.jsonc_parent is None and second.jsonc_parent is items)
+
+print('Test 35')
+data = jsonc.loads('{\n    "a": {"y": 1}, // old\n    "b": [1]\n}')
+data.jsonc_comments = {'a': [('c', ' new')]}
+assert(data.jsonc_dirty and data.jsonc_span is None)
+output = jsonc.dumps(data, incremental=True)
+assert('// new' in output and '// old' not in output)
+data['b'].jsonc_comments = {None: [('c', ' end')]}
+assert('// end' in jsonc.dumps(data, incremental=True))
+first = jsonc.loads('{"a": {"y": 1}, "z": 2}')
+second = jsonc.loads('{"w": 1}')
+second['x'] = first['a']
+first['a']['y'] = 5
+assert(jsonc.dumps(first, incremental=True) == '{"a": {"y": 5}, "z": 2}')
+assert(json.loads(jsonc.dumps(second, incremental=True)) == {'w': 1, 'x': {'y': 5}})
+
+print('Test 36')
+jsonc.cache_clear()
+config = jsonc.load_cached('test/test.in.jsonc')
+for key, value in config.items():
+    if isinstance(value, dict):
+        value['a'] = 'changed'
+for value in config.values():
+    if isinstance(value, list):
+        value.append('c')
+copies = (dict(config), {**config}, config.copy())
+assert(all(copy['bar'] is config['bar'] and copy['foo'] is config['foo'] for copy in copies))
+config['foo'].copy()[2]['a'] = 'changed'
+assert(config['foo'][2]['a'] == 'changed')
+key, value = config.popitem()
+assert(key not in config and jsonc.dumps(jsonc.load_cached('test/test.in.jsonc')) == expected)
+jsonc.cache_clear()
+
+print('Test 37')
+def parse_all(document):
+    # the text and bytes parsers and the one for plain data have to agree
+    results = [jsonc.loads(document), jsonc.loads(document.encode('utf-8')), jsonc.loads(document, preserve_comments=False)]
+    assert(results[0] == results[1] == results[2])
+    assert(jsonc.dumps(results[0]) == jsonc.dumps(results[1]))
+    if isinstance(results[0], (dict, list)):
+        assert(results[0].jsonc_comments == results[1].jsonc_comments)
+    return results[0]
+assert(parse_all('{"a": [1, 2,], "b": {"c": 1,},}') == {'a': [1, 2], 'b': {'c': 1}})
+assert(parse_all('[\n    1,\n    2, // two\n]') == [1, 2])
+assert(parse_all('{"a": 1\n "b": 2}') == {'a': 1, 'b': 2})
+for document in ('{"a": 1 "b": 2}', '[1 2]', '{"a": 1,,}', '[,]', '{"a": 1 /* not closed', '/* not closed', '{"a": 1} x', '[1/* c */2]', '{"a": 1/**/0}'):
+    for source in (document, document.encode('utf-8')):
+        for preserve_comments in (True, False):
+            try:
+                jsonc.loads(source, preserve_comments=preserve_comments)
+                assert(False), document
+            except json.JSONDecodeError:
+                pass
+for document, line in (('{\n    "a": 1,\n    "b" 2\n}', 3), ('[\n    1,\n    /* a\n    b */ tru\n]', 4), ('{\n    "a": "open', 2)):
+    errors = []
+    for source in (document, document.encode('utf-8')):
+        try:
+            jsonc.loads(source)
+            assert(False), document
+        except json.JSONDecodeError as err:
+            errors.append((err.lineno, err.colno, err.pos))
+    assert(errors[0] == errors[1] and errors[0][0] == line), errors
+assert(parse_all('{\n    "a": 1, /* one */\n    /* two */\n    "b": 2\n}').jsonc_comments == {'a': [('inline_block_c', ' one ')], 'b': [('block_c', ' two ')]})
+assert(parse_all('[\n    1, /* one */ // two\n    2 /* three */\n]').jsonc_comments == {0: [('inline_block_c', ' one '), ('inline_c', ' two')], 1: [('inline_block_c', ' three ')]})
+data = parse_all('{"a": "say \\"hi\\" // not a comment", "b": "# nor /* this */", "c": "\\\\"} // real')
+assert(data == {'a': 'say "hi" // not a comment', 'b': '# nor /* this */', 'c': '\\'})
+assert(data.jsonc_comments == {})
+data = parse_all('{"a" /* one */ : /* two */ 1, "b" // three\n : # four\n 2}')
+assert(data == {'a': 1, 'b': 2})
+assert(data.jsonc_comments == {'a': [('block_c', ' one '), ('block_c', ' two ')], 'b': [('inline_c', ' three'), ('python', ' four')]})
+assert(parse_all('[1, // one\n 2]').jsonc_comments == {0: [('inline_c', ' one')]})
+data = parse_all('// list\n[1, "a", [null]]')
+assert(type(data) == jsonc.JSONCList and data == [1, 'a', [None]] and type(data[2]) == jsonc.JSONCList)
+for document, value in (('"top" // string', 'top'), ('42', 42), (' null ', None), ('true', True), ('-1.5e3', -1500.0)):
+    assert(parse_all(document) == value and type(parse_all(document)) == type(value))
+
+print('Test 38')
+snapshot = jsonc.loads('{"a": {"k": 1}}').freeze()
+before = hash(snapshot)
+data = jsonc.loads('{}')
+data['x'] = snapshot['a']
+data['x']['k'] = 2
+items = jsonc.loads('[]')
+items.append(snapshot['a'])
+items.insert(0, snapshot['a'])
+items[0]['k'] = 3
+items[1]['k'] = 4
+data.update(snapshot)
+data['a']['k'] = 5
+assert(snapshot == {'a': {'k': 1}} and hash(snapshot) == before)
+assert(data == {'x': {'k': 2}, 'a': {'k': 5}} and items == [{'k': 3}, {'k': 4}])
+jsonc.cache_clear()
+data['y'] = jsonc.merge(jsonc.load_cached('test/test.in.jsonc'))['bar']
+data['y']['a'] = 99
+assert(jsonc.load_cached('test/test.in.jsonc')['bar']['a'] == 'b')
+jsonc.cache_clear()
+
+print('Test 39')
+document = '// license\n/* header */\n{\n    "a": 1, /* note */\n    "b": [\n        1, /* one */\n        2\n    ]\n} // end\n# tail'
+with open(out_path, 'w') as f:
+    f.write(document)
+for data in (jsonc.loads(document), jsonc.loads(document.encode('utf-8')), jsonc.load_cached(out_path)):
+    assert(data.jsonc_comments == {'a': [('inline_block_c', ' note ')]})
+    assert(data['b'].jsonc_comments == {0: [('inline_block_c', ' one ')]})
+    for copy in (data, pickle.loads(pickle.dumps(data)), data.freeze().thaw()):
+        assert(jsonc.dumps(copy) == jsonc.dumps(copy, incremental=True) == document)
+assert(jsonc.dumps(jsonc.loads(document), comments=False).startswith('{'))
+jsonc.cache_clear()
+
 print('All tests passed')
\ No newline at end of file